@@ -16,15 +16,32 @@ Usage:
 """
 
 import argparse
+import logging
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.api.veo3_client import Veo3Client, Veo3ClientError
-from src.prompts.prompt_builder import build_harry_potter_prompt
-from src.utils.config import Config, setup_logging
+logger = logging.getLogger(__name__)
+
+# Seconds between "still generating" progress messages
+HEARTBEAT_INTERVAL = 30
+
+
+def _heartbeat(stop: threading.Event, interval: float = HEARTBEAT_INTERVAL):
+    """
+    Log progress periodically until stopped, so long waits show signs of life.
+
+    Args:
+        stop: Event that ends the heartbeat when set
+        interval: Seconds between messages
+    """
+    start = time.monotonic()
+    while not stop.wait(interval):
+        logger.info(f"Still generating video... ({time.monotonic() - start:.0f}s elapsed)")
 
 
 def main():
@@ -49,55 +66,60 @@ def main():
 
     args = parser.parse_args()
 
+    # Verify image exists before paying for the API client imports; the
+    # canonical path is then used everywhere downstream
+    try:
+        image_path = Path(args.image_path).resolve(strict=True)
+    except (FileNotFoundError, RuntimeError):
+        print(f"Error: Image file not found: {args.image_path}")
+        return 1
+
+    from src.api.veo3_client import Veo3Client, Veo3ClientError
+    from src.prompts.prompt_builder import build_harry_potter_prompt
+    from src.utils.config import Config, setup_logging
+
     try:
         # Load configuration
-        print("Loading configuration...")
         config = Config.from_env()
         setup_logging(config)
 
-        # Verify image exists
-        image_path = Path(args.image_path)
-        if not image_path.exists():
-            print(f"Error: Image file not found: {args.image_path}")
-            return 1
-
-        print(f"Image: {image_path}")
-        print(f"Intensity: {args.intensity}")
-        print(f"Photo Type: {args.photo_type}")
-        print(f"Duration: {args.duration}s")
-        print()
+        logger.info(
+            f"Image={image_path} intensity={args.intensity} photo_type={args.photo_type} duration={args.duration}s"
+        )
 
         # Build prompt
         if args.custom_prompt:
-            print(f"Using custom prompt: {args.custom_prompt}")
+            logger.info("Using custom prompt")
             prompt = args.custom_prompt
         else:
-            print("Building Harry Potter style animation prompt...")
             prompt = build_harry_potter_prompt(
                 photo_type=args.photo_type, intensity=args.intensity, duration=args.duration
             )
-            print(f"Prompt: {prompt[:100]}...")
-        print()
+        logger.info(f"Prompt: {prompt[:100]}...")
 
         # Initialize Veo3 client
-        print("Initializing Veo 3 API client...")
         client = Veo3Client(api_key=config.google_api_key, model_name=config.model_name)
-        print()
 
         # Generate video
-        print("Starting video generation...")
-        print("This may take a few minutes. Please wait...")
-        print()
-
-        output_path = client.generate_video(image_path=str(image_path), prompt=prompt, output_path=args.output)
-
-        print()
-        print("=" * 60)
-        print("SUCCESS!")
-        print("=" * 60)
-        print(f"Video saved to: {output_path}")
-        print()
-        print("Your magical Harry Potter style portrait is ready!")
+        print("Starting video generation. This may take a few minutes...", flush=True)
+
+        stop_heartbeat = threading.Event()
+        threading.Thread(target=_heartbeat, args=(stop_heartbeat,), daemon=True).start()
+        try:
+            output_path = client.generate_video(image_path=str(image_path), prompt=prompt, output_path=args.output)
+        finally:
+            stop_heartbeat.set()
+
+        summary = [
+            "",
+            "=" * 60,
+            "SUCCESS!",
+            "=" * 60,
+            f"Video saved to: {output_path}",
+            "",
+            "Your magical Harry Potter style portrait is ready!",
+        ]
+        print("\n".join(summary), flush=True)
         return 0
 
     except ValueError as e:
@@ -5,37 +5,230 @@ This module uses Gemini Vision to analyze images and generate
 contextual prompts for magical animations.
 """
 
+import asyncio
+import hashlib
+import io
+import json
 import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-
-from google import genai
-from google.genai import types
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import httpx
+from google.genai import errors, types
+
+from src.api.genai_client import get_genai_client
+from src.prompts.gemini_templates import (
+    ANALYSIS_PROMPT,
+    PROMPT_VERSION,
+    build_analyze_and_prompt_request,
+    build_prompt_request,
+)
+from src.utils.backoff import backoff_delay
+from src.utils.gemini_cache import GeminiCache, image_cache_key
+from src.utils.image_utils import downscale_for_analysis, heif_to_jpeg, is_heif
 
 logger = logging.getLogger(__name__)
 
+# Single-flight registry: identical analyses (and analysis-and-prompt requests) within a
+# process share one Gemini call. Bounded to the most recent requests; older results live
+# on in the persistent cache.
+_analysis_lock = threading.Lock()
+_analysis_futures: "OrderedDict[tuple, Future]" = OrderedDict()
+ANALYSIS_FUTURES_MAX = 64
+
+# An image can be given as a file path or as already-encoded bytes
+ImageSource = Union[str, bytes]
+
+T = TypeVar("T")
+
+# Section headers and numbered/bulleted items of a plain-text analysis
+_SECTION_RE = re.compile(r"^(PEOPLE|OBJECTS|SETTING|MAGICAL[_ ]ACTIONS)\s*:\s*(.*)$")
+_ITEM_RE = re.compile(r"^[\d-][\d.\-)\s]*(.*)$")
+
+# Batch job states after which polling stops
+_BATCH_DONE_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+# Structured output of an analysis (same keys as _parse_analysis produces)
+_ANALYSIS_SCHEMA = types.Schema(
+    type="OBJECT",
+    properties={
+        "people": types.Schema(type="STRING"),
+        "objects": types.Schema(type="ARRAY", items=types.Schema(type="STRING")),
+        "setting": types.Schema(type="STRING"),
+        "magical_actions": types.Schema(type="ARRAY", items=types.Schema(type="STRING")),
+    },
+    required=["people", "objects", "setting", "magical_actions"],
+)
+
+# Structured output of a combined analysis-and-prompt request
+_ANALYZE_AND_PROMPT_SCHEMA = types.Schema(
+    type="OBJECT",
+    properties={"analysis": _ANALYSIS_SCHEMA, "magical_prompt": types.Schema(type="STRING")},
+    required=["analysis", "magical_prompt"],
+    # The prompt comes last, so it can be streamed once the analysis is complete
+    property_ordering=["analysis", "magical_prompt"],
+)
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Whether a Gemini request failure is worth retrying (rate limit, server error, timeout)."""
+    if isinstance(error, errors.ServerError):
+        return True
+    if isinstance(error, errors.APIError):
+        return error.code == 429
+    return isinstance(error, (TimeoutError, httpx.TimeoutException))
+
+
+def _guess_mime_type(data: bytes) -> str:
+    """Guess an image MIME type from its magic bytes (defaults to JPEG)."""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+class _JsonStringFieldStream:
+    """
+    Pass the text of one JSON string field to a callback while the response streams in.
+
+    The raw stream is JSON, so its chunks are scanned for the field's key and
+    the string value is unescaped incrementally; everything else is ignored.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str, on_text: Callable[[str], None]):
+        """
+        Initialize the stream.
+
+        Args:
+            field: Name of the string field to follow
+            on_text: Callback receiving the field's text as it arrives
+        """
+        self._key_re = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._on_text = on_text
+        # Raw text not yet consumed; once the key is found it starts inside the value
+        self._buffer = ""
+        self._in_value = False
+        self._done = False
+
+    def feed(self, chunk: str):
+        """
+        Consume a chunk of the raw response.
+
+        Args:
+            chunk: Next piece of the streamed JSON text
+        """
+        if self._done:
+            return
+        self._buffer += chunk
+        if not self._in_value:
+            match = self._key_re.search(self._buffer)
+            if match is None:
+                return
+            self._buffer = self._buffer[match.end() :]
+            self._in_value = True
+
+        buffer = self._buffer
+        text = []
+        i = 0
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self._done = True
+                break
+            if char != "\\":
+                text.append(char)
+                i += 1
+                continue
+
+            # Escapes split across chunks wait for the rest to arrive
+            if i + 1 >= len(buffer):
+                break
+            if buffer[i + 1] != "u":
+                text.append(self._ESCAPES.get(buffer[i + 1], buffer[i + 1]))
+                i += 2
+                continue
+            if i + 6 > len(buffer):
+                break
+            code = int(buffer[i + 2 : i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # A surrogate pair spells one character across two escapes
+                if i + 12 > len(buffer):
+                    break
+                low = int(buffer[i + 8 : i + 12], 16)
+                text.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                i += 12
+                continue
+            text.append(chr(code))
+            i += 6
+
+        self._buffer = buffer[i:]
+        if text:
+            self._on_text("".join(text))
+
 
 class GeminiAnalyzer:
     """Analyzer for understanding image content using Gemini Vision."""
 
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
+    # Files API uploads expire after 48 hours; stop reusing them well before
+    UPLOAD_TTL_SECONDS = 36 * 3600
+    UPLOAD_CACHE_MAXSIZE = 128
+
+    # Retries of transient generate_content failures (429, 5xx, timeouts)
+    MAX_API_ATTEMPTS = 6
+    RETRY_BASE_DELAY = 1
+    RETRY_MAX_DELAY = 30
+
+    # Batch API: only worth it for several images; jobs may take hours
+    BATCH_MIN_IMAGES = 8
+    BATCH_POLL_INTERVAL = 30
+    BATCH_MAX_POLL_INTERVAL = 300
+    BATCH_TIMEOUT = 24 * 3600
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-2.5-flash",
+        genai_client=None,
+        use_cache: bool = True,
+    ):
         """
         Initialize Gemini analyzer.
 
         Args:
             api_key: Google API key
             model_name: Gemini model to use (default: gemini-2.5-flash)
+            genai_client: Optional existing genai.Client to share (default: shared client for api_key)
+            use_cache: Reuse persisted results for images analyzed before (default: True)
         """
-        self.client = genai.Client(api_key=api_key)
+        self.client = genai_client or get_genai_client(api_key)
         self.model_name = model_name
+        self._cache = GeminiCache() if use_cache else None
+        # LRU of prepared image content (Files API handle or inline part) and
+        # when it was prepared, by image key
+        self._uploads: "OrderedDict[tuple, Tuple[object, float]]" = OrderedDict()
+        self._uploads_lock = threading.Lock()
         logger.info(f"GeminiAnalyzer initialized with model: {model_name}")
 
-    def analyze_for_animation(self, image_path: str) -> dict:
+    def analyze_for_animation(self, image_path: ImageSource) -> dict:
         """
         Analyze image to identify objects and suggest magical animations.
 
         Args:
-            image_path: Path to image file
+            image_path: Path to image file, or encoded image bytes
 
         Returns:
             Dictionary containing:
@@ -44,145 +237,697 @@ class GeminiAnalyzer:
             - setting: Description of the setting/background
             - magical_suggestions: List of suggested magical interactions
         """
-        image_file = Path(image_path)
-        if not image_file.exists():
-            raise FileNotFoundError(f"Image not found: {image_path}")
+        return self._single_flight(self._image_key(image_path), lambda: self._run_analysis(image_path))
 
-        logger.info(f"Analyzing image for animation potential: {image_path}")
+    def _single_flight(self, key: tuple, compute: Callable[[], T]) -> T:
+        """
+        Run compute() once for concurrent callers with the same key.
 
-        # Upload image file first
-        uploaded_file = self.client.files.upload(file=str(image_file))
-        logger.debug(f"Uploaded file: {uploaded_file.name}")
+        A completed result is kept in the registry for later callers too,
+        unless caching is disabled: then only calls already in flight are
+        shared, so every new request gets a fresh result.
 
-        # Create analysis prompt
-        analysis_prompt = """Analyze this photograph for creating a magical Harry Potter-style animated portrait.
+        Args:
+            key: Identity of the request (see _image_key)
+            compute: Function making the request
 
-Please identify:
+        Returns:
+            Result of compute(), possibly from another caller's run
+        """
+        with _analysis_lock:
+            future = _analysis_futures.get(key)
+            is_owner = future is None or (self._cache is None and future.done())
+            if is_owner:
+                future = Future()
+                _analysis_futures[key] = future
+                _analysis_futures.move_to_end(key)
+                while len(_analysis_futures) > ANALYSIS_FUTURES_MAX:
+                    _analysis_futures.popitem(last=False)
+
+        if not is_owner:
+            logger.info("Reusing existing image analysis")
+            return future.result()
 
-1. PEOPLE: Describe each person (appearance, clothing, position, expression)
-2. OBJECTS: List specific objects they could interact with (in hands, nearby, in background)
-3. SETTING: Describe the location/environment
-4. MAGICAL INTERACTIONS: Suggest 5-7 SUBTLE creative magical actions ONLY using objects already in the photo:
-   - SUBTLE movements: objects gently floating, swaying, or shifting position
-   - Existing objects subtly transforming or changing
-   - Objects responding to gestures in understated ways
-   - Things already in the photo coming alive with MINIMAL animation
-   - People interacting with each other (whispering, gesturing, glancing, small smiles)
-   - People turning to face the camera and speaking/gesturing to the viewer
-   - People acknowledging the camera viewer's presence with subtle expressions
-   - AVOID: Magical dust, sparkles, glowing lights, obvious magical effects, wisps, or auras
-   - IMPORTANT: Do NOT suggest adding new objects, creatures, or elements that aren't in the photo
-   - EMPHASIS: Keep effects vintage and understated, like old magical photographs
+        try:
+            result = compute()
+        except Exception as e:
+            # Drop failed entries so a later call can retry
+            with _analysis_lock:
+                if _analysis_futures.get(key) is future:
+                    del _analysis_futures[key]
+            future.set_exception(e)
+            raise
 
-Be specific about which EXISTING objects they should interact with and how people interact with each other and the viewer!
+        future.set_result(result)
+        return result
 
-Format your response as:
-PEOPLE: [descriptions]
-OBJECTS: [list specific items]
-SETTING: [description]
-MAGICAL_ACTIONS: [numbered list of 5-7 specific SUBTLE magical interactions]"""
+    def _image_key(self, image: ImageSource) -> tuple:
+        """
+        Build an identity key for an image source.
 
+        Args:
+            image: Path to image file, or encoded image bytes
+
+        Returns:
+            Hashable key identifying the image contents
+
+        Raises:
+            FileNotFoundError: If the image path doesn't exist
+        """
+        if isinstance(image, bytes):
+            return (self.model_name, hashlib.blake2b(image, digest_size=16).hexdigest())
+
+        # One stat both checks existence and fingerprints the file
+        image_file = Path(image)
         try:
-            # Generate analysis
-            response = self.client.models.generate_content(
-                model=self.model_name, contents=[analysis_prompt, uploaded_file]
+            stat = image_file.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Image not found: {image}") from None
+
+        return (self.model_name, str(image_file.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def _cache_key(self, image: ImageSource, *parts: str) -> Optional[str]:
+        """
+        Build a persistent cache key for a result about an image.
+
+        Args:
+            image: Path to image file, or encoded image bytes
+            *parts: Result kind and qualifiers (e.g. "prompt", intensity)
+
+        Returns:
+            Cache key, or None when caching is disabled
+        """
+        if self._cache is None:
+            return None
+        return image_cache_key(image, self.model_name, PROMPT_VERSION, *parts)
+
+    def _cache_get(self, key: Optional[str]):
+        """Look up a cached result (None on miss or when caching is disabled)."""
+        if key is None:
+            return None
+        value = self._cache.get(key)
+        if value is not None:
+            logger.info("Using cached Gemini result")
+        return value
+
+    def _cache_set(self, key: Optional[str], value):
+        """Persist a result (no-op when caching is disabled)."""
+        if key is not None:
+            self._cache.set(key, value)
+
+    def _call_model(self, on_chunk: Optional[Callable[[str], None]] = None, **request) -> str:
+        """
+        Call generate_content, retrying transient failures with jittered backoff.
+
+        Args:
+            on_chunk: Optional callback receiving response text as it streams in
+            **request: Keyword arguments for client.models.generate_content
+
+        Returns:
+            Response text
+        """
+        for attempt in range(self.MAX_API_ATTEMPTS):
+            streamed = False
+            try:
+                if on_chunk is None:
+                    return self.client.models.generate_content(**request).text
+
+                parts = []
+                for chunk in self.client.models.generate_content_stream(**request):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        streamed = True
+                        on_chunk(chunk.text)
+                return "".join(parts)
+            except Exception as e:
+                # A stream that already delivered text can't be retried transparently
+                if streamed or not _is_transient_error(e) or attempt == self.MAX_API_ATTEMPTS - 1:
+                    raise
+                delay = backoff_delay(attempt, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY)
+                logger.warning(
+                    f"Gemini request failed (attempt {attempt + 1}/{self.MAX_API_ATTEMPTS}): {e}. "
+                    f"Retrying in {delay:.1f}s..."
+                )
+                time.sleep(delay)
+
+    async def _call_model_async(self, **request) -> str:
+        """
+        Async variant of _call_model() using the genai async client.
+
+        Args:
+            **request: Keyword arguments for client.aio.models.generate_content
+
+        Returns:
+            Response text
+        """
+        for attempt in range(self.MAX_API_ATTEMPTS):
+            try:
+                response = await self.client.aio.models.generate_content(**request)
+                return response.text
+            except Exception as e:
+                if not _is_transient_error(e) or attempt == self.MAX_API_ATTEMPTS - 1:
+                    raise
+                delay = backoff_delay(attempt, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY)
+                logger.warning(
+                    f"Gemini request failed (attempt {attempt + 1}/{self.MAX_API_ATTEMPTS}): {e}. "
+                    f"Retrying in {delay:.1f}s..."
+                )
+                await asyncio.sleep(delay)
+
+    def _image_content(self, image: ImageSource):
+        """
+        Prepare an image for a generate_content request.
+
+        HEIC/HEIF photos are converted to JPEG first. Large images are then
+        downscaled to 1024px, which is all the analysis needs, and sent
+        inline. Other bytes are sent inline as-is; other paths are uploaded
+        through the Files API. Prepared content for a path is memoized by
+        (path, mtime, size) for UPLOAD_TTL_SECONDS, so repeated requests
+        about the same file don't upload it again.
+
+        Args:
+            image: Path to image file, or encoded image bytes
+
+        Returns:
+            Content part or uploaded file handle
+        """
+        if isinstance(image, bytes):
+            downscaled = downscale_for_analysis(image)
+            if downscaled is not None:
+                return types.Part.from_bytes(data=downscaled, mime_type="image/jpeg")
+            return types.Part.from_bytes(data=image, mime_type=_guess_mime_type(image))
+
+        key = self._image_key(image)
+        with self._uploads_lock:
+            entry = self._uploads.get(key)
+            if entry is not None and time.time() - entry[1] < self.UPLOAD_TTL_SECONDS:
+                self._uploads.move_to_end(key)
+                logger.debug("Reusing prepared image")
+                return entry[0]
+
+        # Phone photos: decode HEIC once and work from the cached JPEG.
+        # The file is read once; downscaling and uploading share the bytes.
+        data = (heif_to_jpeg(image) if is_heif(image) else Path(image)).read_bytes()
+        downscaled = downscale_for_analysis(data)
+        if downscaled is not None:
+            content = types.Part.from_bytes(data=downscaled, mime_type="image/jpeg")
+        else:
+            content = self.client.files.upload(
+                file=io.BytesIO(data), config=types.UploadFileConfig(mime_type=_guess_mime_type(data))
             )
+            logger.debug(f"Uploaded file: {content.name}")
+
+        evicted = []
+        with self._uploads_lock:
+            self._uploads[key] = (content, time.time())
+            self._uploads.move_to_end(key)
+            while len(self._uploads) > self.UPLOAD_CACHE_MAXSIZE:
+                evicted.append(self._uploads.popitem(last=False)[1][0])
+
+        for old_content in evicted:
+            self._delete_upload(old_content)
+        return content
+
+    def _delete_upload(self, content):
+        """
+        Delete an uploaded file that is no longer memoized.
+
+        Args:
+            content: Content part or uploaded file handle
+        """
+        if isinstance(content, types.Part):
+            # Nothing was uploaded for inline images
+            return
+
+        try:
+            self.client.files.delete(name=content.name)
+            logger.debug(f"Deleted uploaded file: {content.name}")
+        except Exception as e:
+            # Uploads expire on their own; a failed delete is harmless
+            logger.debug(f"Failed to delete uploaded file {content.name}: {e}")
+
+    def _run_analysis(self, image: ImageSource) -> dict:
+        """
+        Send the image and run the Gemini analysis request.
 
-            analysis_text = response.text
+        Args:
+            image: Path to image file, or encoded image bytes
+
+        Returns:
+            Parsed analysis dictionary
+        """
+        cache_key = self._cache_key(image, "analysis")
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        logger.info("Analyzing image for animation potential...")
+
+        image_content = self._image_content(image)
+
+        try:
+            # Generate analysis
+            analysis_text = self._call_model(
+                model=self.model_name,
+                contents=[ANALYSIS_PROMPT, image_content],
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json", response_schema=_ANALYSIS_SCHEMA
+                ),
+            )
             logger.debug(f"Gemini analysis:\n{analysis_text}")
 
             # Parse the response
             parsed = self._parse_analysis(analysis_text)
             logger.info(f"Identified {len(parsed.get('objects', []))} interactive objects")
 
+            self._cache_set(cache_key, parsed)
             return parsed
 
         except Exception as e:
             logger.error(f"Failed to analyze image: {e}")
             raise
 
-    def generate_magical_prompt(self, image_path: str, intensity: str = "moderate") -> str:
+    def generate_magical_prompt(
+        self,
+        image_path: ImageSource,
+        intensity: str = "moderate",
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
         """
         Generate a contextual magical animation prompt based on image analysis.
 
+        If the image has not been analyzed yet, the analysis and prompt come
+        from one combined request (see analyze_and_prompt()); otherwise the
+        known analysis is reused and only the prompt is requested.
+
         Args:
-            image_path: Path to image file
+            image_path: Path to image file, or encoded image bytes
             intensity: Animation intensity (subtle, moderate, dramatic)
+            on_chunk: Optional callback receiving response text as it streams in
 
         Returns:
             Customized animation prompt
         """
-        # Analyze the image
-        analysis = self.analyze_for_animation(image_path)
-
-        # Upload image for prompt generation
-        image_file = Path(image_path)
-        uploaded_file = self.client.files.upload(file=str(image_file))
-
-        prompt_request = f"""Based on this image analysis, create a detailed animation prompt for Veo video generation.
-
-ANALYSIS:
-People: {analysis.get('people', 'person in photo')}
-Objects: {analysis.get('objects', 'various objects')}
-Setting: {analysis.get('setting', 'scene')}
-Suggested magical actions: {analysis.get('magical_actions', [])}
-
-IMPORTANT INSTRUCTION STYLE:
-- Write as SPECIFIC INSTRUCTIONS to a video generator, not a general description
-- Use definite articles: "THE blonde woman", "THE man in the blue shirt", "THE book on the table", "THE dog", "THE cat"
-- NOT: "a person smiles" but "the blonde woman smiles at the camera"
-- NOT: "someone waves" but "the tall man in the grey suit waves his right hand"
-- Be CONCRETE and SPECIFIC about who does what, referencing their appearance from the analysis
-- CRITICAL: MAXIMIZE interactions between ALL characters (people, animals, pets, etc.)
-- If there are multiple people/animals, they MUST interact frequently - looking at each other, touching, gesturing, reacting
-- Animals should interact with people and other animals
-- Create a sense of CONNECTION and RELATIONSHIP between all subjects
-
-Create a {intensity} animation prompt with these requirements:
-1. Maintains the original photo's colors and aesthetic - vintage photograph style
-2. NO FRAMES or BORDERS - photograph only
-3. Use SPECIFIC references: "the [hair color] [man/woman] with [clothing/feature]" does [action]
-4. At least one person ALWAYS looking directly at camera throughout - specify WHICH person by their appearance
-5. Include 2-3 of the suggested magical interactions - be specific about WHICH objects and WHO interacts with them
-6. MANDATORY: If multiple people/animals/characters are present, they MUST interact extensively:
-   - "the woman in red leans toward the bearded man and whispers in his ear"
-   - "the golden retriever nuzzles against the man's leg while he pets its head"
-   - "the woman glances at the man, who smiles back at her"
-   - "the cat rubs against the child's arm as the child reaches to pet it"
-   - Specify WHO does WHAT to WHOM using their specific descriptions
-7. Describe viewer interactions specifically: "the blonde woman turns her gaze to the camera and smirks"
-8. Balance interactions: mix character-to-character AND character-to-viewer interactions
-9. Seamlessly loops from end to beginning
-10. Keeps background mostly static
-11. 8 seconds duration
-12. CRITICAL: DO NOT add any new objects or creatures that aren't already visible in the photo
-13. ONLY animate or make magical the objects, people, and elements that are ALREADY in the photo
-14. Objects can move subtly, shift position, or interact, but nothing new should appear
-15. SUBTLETY IS KEY: Avoid magical dust, sparkles, glowing lights, wisps, auras, or obvious magical effects
-16. Keep all effects UNDERSTATED and VINTAGE - like subtle movements in an old magical photograph
-17. Focus on expressions, gestures, small movements, and natural interactions rather than flashy effects
-
-Write ONLY the animation prompt as specific video generation instructions. Use "the [specific person]" language throughout!"""
+        cache_key = self._cache_key(image_path, "prompt", intensity)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        analysis = self._known_analysis(image_path)
+        if analysis is None:
+            return self.analyze_and_prompt(image_path, intensity, on_prompt_chunk=on_chunk)[1]
 
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name, contents=[prompt_request, uploaded_file]
-            )
+            # Reuses the analysis upload rather than sending the image again
+            image_content = self._image_content(image_path)
+
+            prompt_request = build_prompt_request(analysis, intensity)
 
-            prompt = response.text.strip()
+            prompt = self._call_model(
+                on_chunk=on_chunk, model=self.model_name, contents=[prompt_request, image_content]
+            ).strip()
             logger.info("Generated contextual magical prompt")
             logger.debug(f"Prompt: {prompt}")
 
+            self._cache_set(cache_key, prompt)
             return prompt
 
         except Exception as e:
             logger.error(f"Failed to generate prompt: {e}")
             raise
 
+    def _known_analysis(self, image: ImageSource) -> Optional[dict]:
+        """
+        Get an analysis of the image that needs no new request, if there is one.
+
+        Args:
+            image: Path to image file, or encoded image bytes
+
+        Returns:
+            Cached or already-computed analysis, or None
+        """
+        with _analysis_lock:
+            future = _analysis_futures.get(self._image_key(image))
+        # Without caching only an analysis still in flight counts as known
+        if future is not None and (self._cache is not None or not future.done()):
+            # In flight or done: waiting is cheaper than a second request
+            return future.result()
+        return self._cache_get(self._cache_key(image, "analysis"))
+
+    def analyze_and_prompt(
+        self,
+        image_path: ImageSource,
+        intensity: str = "moderate",
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_prompt_chunk: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[dict, str]:
+        """
+        Analyze an image and generate its magical prompt in a single Gemini request.
+
+        Equivalent to analyze_for_animation() followed by generate_magical_prompt(),
+        but sends the image once and costs one round trip instead of two.
+
+        Args:
+            image_path: Path to image file, or encoded image bytes
+            intensity: Animation intensity (subtle, moderate, dramatic)
+            on_chunk: Optional callback receiving the raw JSON response text as it streams in
+            on_prompt_chunk: Optional callback receiving the prompt text as it streams in
+
+        Returns:
+            Tuple of (analysis dictionary, animation prompt)
+
+        Raises:
+            ValueError: If Gemini's response is not the expected JSON
+        """
+        # Concurrent callers for the same image and intensity share one request
+        key = self._image_key(image_path) + ("prompt", intensity)
+        return self._single_flight(
+            key, lambda: self._run_analyze_and_prompt(image_path, intensity, on_chunk, on_prompt_chunk)
+        )
+
+    def _run_analyze_and_prompt(
+        self,
+        image: ImageSource,
+        intensity: str,
+        on_chunk: Optional[Callable[[str], None]],
+        on_prompt_chunk: Optional[Callable[[str], None]],
+    ) -> Tuple[dict, str]:
+        """
+        Send the image and run the combined analysis-and-prompt request.
+
+        Args:
+            image: Path to image file, or encoded image bytes
+            intensity: Animation intensity (subtle, moderate, dramatic)
+            on_chunk: Optional callback receiving the raw JSON response text as it streams in
+            on_prompt_chunk: Optional callback receiving the prompt text as it streams in
+
+        Returns:
+            Tuple of (analysis dictionary, animation prompt)
+        """
+        cache_keys = self._analyze_and_prompt_cache_keys(image, intensity)
+        cached = self._cached_analysis_and_prompt(*cache_keys)
+        if cached is not None:
+            return cached
+
+        logger.info("Analyzing image and generating magical prompt...")
+
+        image_content = self._image_content(image)
+
+        if on_prompt_chunk is not None:
+            prompt_stream = _JsonStringFieldStream("magical_prompt", on_prompt_chunk)
+            on_raw_chunk = on_chunk
+
+            def on_chunk(text: str):
+                if on_raw_chunk is not None:
+                    on_raw_chunk(text)
+                prompt_stream.feed(text)
+
+        try:
+            request = self._analyze_and_prompt_args(image_content, intensity)
+            response_text = self._call_model(on_chunk=on_chunk, **request)
+            return self._finish_analyze_and_prompt(response_text, *cache_keys)
+
+        except Exception as e:
+            logger.error(f"Failed to analyze image and generate prompt: {e}")
+            raise
+
+    async def analyze_and_prompt_async(self, image_path: ImageSource, intensity: str = "moderate") -> Tuple[dict, str]:
+        """
+        Async variant of analyze_and_prompt() using the genai async client.
+
+        Args:
+            image_path: Path to image file, or encoded image bytes
+            intensity: Animation intensity (subtle, moderate, dramatic)
+
+        Returns:
+            Tuple of (analysis dictionary, animation prompt)
+
+        Raises:
+            ValueError: If Gemini's response is not the expected JSON
+        """
+        cache_keys = self._analyze_and_prompt_cache_keys(image_path, intensity)
+        cached = self._cached_analysis_and_prompt(*cache_keys)
+        if cached is not None:
+            return cached
+
+        logger.info("Analyzing image and generating magical prompt...")
+
+        # Uploads go through the shared (thread-safe) upload memo
+        loop = asyncio.get_running_loop()
+        image_content = await loop.run_in_executor(None, self._image_content, image_path)
+
+        try:
+            response_text = await self._call_model_async(**self._analyze_and_prompt_args(image_content, intensity))
+            return self._finish_analyze_and_prompt(response_text, *cache_keys)
+
+        except Exception as e:
+            logger.error(f"Failed to analyze image and generate prompt: {e}")
+            raise
+
+    def analyze_and_prompt_batch(
+        self,
+        images: Sequence[ImageSource],
+        intensity: str = "moderate",
+        max_concurrency: int = 5,
+    ) -> List[Union[Tuple[dict, str], Exception]]:
+        """
+        Analyze and prompt several images concurrently.
+
+        Args:
+            images: Paths to image files, or encoded image bytes
+            intensity: Animation intensity (subtle, moderate, dramatic)
+            max_concurrency: Maximum number of Gemini requests in flight (default: 5)
+
+        Returns:
+            One (analysis, prompt) tuple per image, in input order, or the
+            exception raised for that image
+        """
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def run_one(image: ImageSource):
+                async with semaphore:
+                    return await self.analyze_and_prompt_async(image, intensity)
+
+            return await asyncio.gather(*(run_one(image) for image in images), return_exceptions=True)
+
+        return asyncio.run(run_all())
+
+    def batch_analyze(self, images: Sequence[ImageSource]) -> List[dict]:
+        """
+        Analyze many images through the Gemini Batch API.
+
+        Batch jobs cost less than individual requests but may take minutes
+        to hours. Below BATCH_MIN_IMAGES images, or if the batch job cannot
+        be run, images are analyzed one by one with analyze_for_animation().
+
+        Args:
+            images: Paths to image files, or encoded image bytes
+
+        Returns:
+            One analysis dictionary per image, in input order
+        """
+        if len(images) < self.BATCH_MIN_IMAGES:
+            return [self.analyze_for_animation(image) for image in images]
+
+        cache_keys = [self._cache_key(image, "analysis") for image in images]
+        results: List[Optional[dict]] = [self._cache_get(key) for key in cache_keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if len(pending) >= self.BATCH_MIN_IMAGES:
+            try:
+                batch_results = self._run_batch_analysis([images[i] for i in pending])
+            except Exception as e:
+                logger.warning(f"Batch analysis failed ({e}); analyzing images one by one")
+                batch_results = [None] * len(pending)
+
+            for i, result in zip(pending, batch_results):
+                if result is not None:
+                    results[i] = result
+                    self._cache_set(cache_keys[i], result)
+
+        # Anything the batch didn't cover goes through the regular path
+        return [
+            result if result is not None else self.analyze_for_animation(image)
+            for image, result in zip(images, results)
+        ]
+
+    def _run_batch_analysis(self, images: Sequence[ImageSource]) -> List[Optional[dict]]:
+        """
+        Submit one batch job analyzing all images and wait for it to finish.
+
+        Args:
+            images: Paths to image files, or encoded image bytes
+
+        Returns:
+            Analysis per image, or None where that image's request failed
+
+        Raises:
+            RuntimeError: If the batch job fails or times out
+        """
+        # Prepare (downscale/upload) all images concurrently
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            contents = list(pool.map(self._image_content, images))
+
+        config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=_ANALYSIS_SCHEMA)
+        requests = [
+            types.InlinedRequest(contents=[ANALYSIS_PROMPT, self._as_part(content)], config=config)
+            for content in contents
+        ]
+
+        job = self.client.batches.create(
+            model=self.model_name,
+            src=requests,
+            config=types.CreateBatchJobConfig(display_name=f"magical-photos-analysis-{len(images)}"),
+        )
+        logger.info(f"Submitted batch analysis of {len(images)} images: {job.name}")
+
+        start_time = time.time()
+        poll_interval = self.BATCH_POLL_INTERVAL
+        while job.state not in _BATCH_DONE_STATES:
+            if time.time() - start_time > self.BATCH_TIMEOUT:
+                raise RuntimeError(f"Batch job {job.name} timed out after {self.BATCH_TIMEOUT}s")
+            logger.debug(f"Batch job {job.name}: {job.state} ({int(time.time() - start_time)}s elapsed)")
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, self.BATCH_MAX_POLL_INTERVAL)
+            job = self.client.batches.get(name=job.name)
+
+        if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+            raise RuntimeError(f"Batch job {job.name} ended in state {job.state}: {job.error}")
+
+        results: List[Optional[dict]] = []
+        for item in job.dest.inlined_responses or []:
+            if item.error or item.response is None:
+                logger.warning(f"Batch analysis of one image failed: {item.error}")
+                results.append(None)
+            else:
+                results.append(self._parse_analysis(item.response.text))
+
+        # Missing responses are treated as failures
+        results.extend([None] * (len(images) - len(results)))
+        logger.info(f"Batch analysis finished: {sum(r is not None for r in results)}/{len(images)} succeeded")
+        return results
+
+    @staticmethod
+    def _as_part(content) -> types.Part:
+        """Convert prepared image content (inline part or uploaded file) to a Part."""
+        if isinstance(content, types.Part):
+            return content
+        return types.Part.from_uri(file_uri=content.uri, mime_type=content.mime_type)
+
+    def _analyze_and_prompt_cache_keys(self, image: ImageSource, intensity: str) -> Tuple[Optional[str], Optional[str]]:
+        """Cache keys for the analysis and prompt of an image."""
+        return self._cache_key(image, "analysis"), self._cache_key(image, "prompt", intensity)
+
+    def _cached_analysis_and_prompt(
+        self, analysis_key: Optional[str], prompt_key: Optional[str]
+    ) -> Optional[Tuple[dict, str]]:
+        """Cached (analysis, prompt) pair, or None unless both are cached."""
+        analysis = self._cache_get(analysis_key)
+        prompt = self._cache_get(prompt_key)
+        if analysis is None or prompt is None:
+            return None
+        return analysis, prompt
+
+    def _analyze_and_prompt_args(self, image_content, intensity: str) -> dict:
+        """Keyword arguments for the combined generate_content request."""
+        return {
+            "model": self.model_name,
+            "contents": [build_analyze_and_prompt_request(intensity), image_content],
+            "config": types.GenerateContentConfig(
+                response_mime_type="application/json", response_schema=_ANALYZE_AND_PROMPT_SCHEMA
+            ),
+        }
+
+    def _finish_analyze_and_prompt(
+        self, response_text: str, analysis_key: Optional[str], prompt_key: Optional[str]
+    ) -> Tuple[dict, str]:
+        """Parse a combined response and cache its results."""
+        logger.debug(f"Gemini analysis and prompt:\n{response_text}")
+
+        analysis, prompt = self._parse_analyze_and_prompt(response_text)
+        logger.info(f"Identified {len(analysis['objects'])} interactive objects")
+        logger.info("Generated contextual magical prompt")
+
+        self._cache_set(analysis_key, analysis)
+        self._cache_set(prompt_key, prompt)
+        return analysis, prompt
+
+    def _parse_analyze_and_prompt(self, response_text: str) -> Tuple[dict, str]:
+        """
+        Parse the JSON response of a combined analysis-and-prompt request.
+
+        Args:
+            response_text: Raw text response from Gemini
+
+        Returns:
+            Tuple of (analysis dictionary, animation prompt)
+
+        Raises:
+            ValueError: If the response is not the expected JSON
+        """
+        data = self._load_json(response_text)
+        prompt = str(data.get("magical_prompt", "")).strip()
+        if not prompt:
+            raise ValueError("Gemini response is missing magical_prompt")
+
+        return self._normalize_analysis(data.get("analysis") or {}), prompt
+
     def _parse_analysis(self, analysis_text: str) -> dict:
         """
         Parse Gemini's analysis response into structured data.
 
+        The response is normally JSON matching _ANALYSIS_SCHEMA; plain-text
+        responses in the older PEOPLE:/OBJECTS:/... format are still accepted.
+
+        Args:
+            analysis_text: Raw text response from Gemini
+
+        Returns:
+            Parsed dictionary with people, objects, setting, magical_actions
+        """
+        try:
+            data = self._load_json(analysis_text)
+        except ValueError:
+            logger.debug("Analysis is not JSON, using the plain-text parser")
+            return self._parse_analysis_legacy(analysis_text)
+
+        if not isinstance(data, dict):
+            return self._parse_analysis_legacy(analysis_text)
+        return self._normalize_analysis(data)
+
+    @staticmethod
+    def _load_json(response_text: str):
+        """
+        Decode a JSON response, tolerating a fenced code block around it.
+
+        Raises:
+            ValueError: If the text is not valid JSON
+        """
+        text = response_text.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.startswith("json"):
+                text = text[len("json") :]
+        return json.loads(text)
+
+    @staticmethod
+    def _normalize_analysis(raw: dict) -> dict:
+        """Coerce a decoded JSON analysis to the standard analysis dictionary."""
+        objects = raw.get("objects", [])
+        actions = raw.get("magical_actions", [])
+        return {
+            "people": str(raw.get("people", "")),
+            "objects": [str(obj) for obj in objects] if isinstance(objects, list) else [str(objects)],
+            "setting": str(raw.get("setting", "")),
+            "magical_actions": [str(action) for action in actions] if isinstance(actions, list) else [str(actions)],
+        }
+
+    def _parse_analysis_legacy(self, analysis_text: str) -> dict:
+        """
+        Parse a plain-text PEOPLE:/OBJECTS:/SETTING:/MAGICAL_ACTIONS: analysis.
+
         Args:
             analysis_text: Raw text response from Gemini
 
@@ -190,6 +935,8 @@ Write ONLY the animation prompt as specific video generation instructions. Use "
             Parsed dictionary with people, objects, setting, magical_actions
         """
         result = {"people": "", "objects": [], "setting": "", "magical_actions": []}
+        # Multi-line people/setting text is collected and joined once at the end
+        text_parts = {"people": [], "setting": []}
 
         lines = analysis_text.split("\n")
         current_section = None
@@ -200,29 +947,27 @@ Write ONLY the animation prompt as specific video generation instructions. Use "
                 continue
 
             # Detect sections
-            if line.startswith("PEOPLE:"):
-                current_section = "people"
-                result["people"] = line.replace("PEOPLE:", "").strip()
-            elif line.startswith("OBJECTS:"):
-                current_section = "objects"
-                objects_text = line.replace("OBJECTS:", "").strip()
-                if objects_text:
-                    result["objects"] = [obj.strip() for obj in objects_text.split(",")]
-            elif line.startswith("SETTING:"):
-                current_section = "setting"
-                result["setting"] = line.replace("SETTING:", "").strip()
-            elif line.startswith("MAGICAL_ACTIONS:") or line.startswith("MAGICAL ACTIONS:"):
-                current_section = "magical_actions"
-            elif current_section == "magical_actions" and (line[0].isdigit() or line.startswith("-")):
-                # Extract action (remove numbering)
-                action = line.lstrip("0123456789.-) ").strip()
-                if action:
-                    result["magical_actions"].append(action)
-            elif current_section and line:
+            section_match = _SECTION_RE.match(line)
+            if section_match:
+                current_section = section_match.group(1).lower().replace(" ", "_")
+                value = section_match.group(2)
+                if current_section == "objects":
+                    if value:
+                        result["objects"] = [obj for obj in (item.strip() for item in value.split(",")) if obj]
+                elif current_section in text_parts:
+                    text_parts[current_section] = [value] if value else []
+                continue
+
+            item_match = _ITEM_RE.match(line) if current_section == "magical_actions" else None
+            if item_match:
+                # Extract action (numbering already removed)
+                if item_match.group(1):
+                    result["magical_actions"].append(item_match.group(1))
+            elif current_section in text_parts:
                 # Continue previous section
-                if current_section == "people":
-                    result["people"] += " " + line
-                elif current_section == "setting":
-                    result["setting"] += " " + line
+                text_parts[current_section].append(line)
+
+        for section, parts in text_parts.items():
+            result[section] = " ".join(parts)
 
         return result
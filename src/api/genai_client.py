@@ -0,0 +1,41 @@
+"""
+Shared google-genai client factory.
+
+Keeps one genai.Client per API key for the life of the process so that
+all API wrappers reuse the same HTTP connection pool and its warm
+keep-alive connections.
+
+google.genai is imported on first use: it is slow to import, and modules
+like the Veo client are often imported only for their exception types.
+"""
+
+import functools
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google import genai
+
+logger = logging.getLogger(__name__)
+
+# Per-request HTTP timeout in milliseconds. Veo generation is a long-running
+# operation that is polled, so no single request should take this long.
+DEFAULT_HTTP_TIMEOUT_MS = 120_000
+
+
+@functools.lru_cache(maxsize=4)
+def get_genai_client(api_key: str) -> "genai.Client":
+    """
+    Get the process-wide genai client for an API key.
+
+    Args:
+        api_key: Google API key
+
+    Returns:
+        Shared genai.Client instance
+    """
+    from google import genai
+    from google.genai import types
+
+    logger.debug("Creating shared genai client")
+    return genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=DEFAULT_HTTP_TIMEOUT_MS))
@@ -5,18 +5,31 @@ This module provides a client for interacting with Google's Veo 3 API
 to generate animated videos from static images using the new genai.Client API.
 """
 
-import base64
+import io
 import logging
+import os
+import random
+import re
 import time
 from pathlib import Path
 from typing import Optional
 
-from google import genai
+import requests
 
+from src.api.genai_client import get_genai_client
+from src.utils.backoff import backoff_delay
 from src.utils.rate_limiter import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Error text of transient request failures worth retrying (HTTP codes and their gRPC names)
+_TRANSIENT_ERROR_RE = re.compile(
+    r"502|503|429|Bad Gateway|Service Unavailable|Too Many Requests|RESOURCE_EXHAUSTED|UNAVAILABLE"
+)
+
+# Error text of generations that finished without producing a video
+_NO_VIDEO_ERROR_RE = re.compile(r"No video in response|No response")
+
 
 class Veo3ClientError(Exception):
     """Base exception for Veo3Client errors."""
@@ -47,21 +60,30 @@ class Veo3Client:
 
     SUPPORTED_FORMATS = {".jpg", ".jpeg", ".png", ".webp"}
     MAX_FILE_SIZE_MB = 10
-
-    def __init__(self, api_key: str, model_name: str = "veo-3.1-generate-preview"):
+    DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+    DOWNLOAD_TIMEOUT = 120
+    DEFAULT_ASPECT_RATIO = "16:9"
+    # Status polling starts fast and backs off to poll_interval
+    POLL_INITIAL_DELAY = 2.0
+    POLL_BACKOFF_FACTOR = 1.5
+
+    def __init__(self, api_key: str, model_name: str = "veo-3.1-generate-preview", genai_client=None):
         """
         Initialize Veo 3 client with API key.
 
         Args:
             api_key: Google API key for Gemini/Veo access
             model_name: Veo model name (default: veo-3.1-generate-preview)
+            genai_client: Optional existing genai.Client to share (default: shared client for api_key)
 
         Raises:
             APIConnectionError: If API configuration fails
         """
         try:
-            self.client = genai.Client(api_key=api_key)
+            self.client = genai_client or get_genai_client(api_key)
             self.model_name = model_name
+            self._api_key = api_key
+            self._session = requests.Session()
             logger.info(f"Veo3Client initialized with model: {model_name}")
         except Exception as e:
             logger.error(f"Failed to initialize Veo3Client: {e}")
@@ -106,7 +128,7 @@ class Veo3Client:
         prompt: str,
         output_path: Optional[str] = None,
         timeout: int = 300,
-        poll_interval: int = 10,
+        poll_interval: float = 15,
         aspect_ratio_override: Optional[str] = None,
         use_loop_frames: bool = False,
     ) -> str:
@@ -118,7 +140,7 @@ class Veo3Client:
             prompt: Animation description prompt
             output_path: Optional path for output video (auto-generated if None)
             timeout: Maximum time to wait for generation (seconds)
-            poll_interval: Time between status checks (seconds)
+            poll_interval: Maximum time between status checks (seconds)
             aspect_ratio_override: Override aspect ratio (e.g. "16:9", "9:16", "1:1")
             use_loop_frames: Use same image as first and last frame for perfect looping
 
@@ -150,47 +172,43 @@ class Veo3Client:
             from google.genai import types
             from PIL import Image as PILImage
 
+            # Read the dimensions once (header only; pixels are decoded only if padding is needed)
+            with PILImage.open(image_file) as img:
+                width, height = img.size
+            current_aspect = width / height
+
             # Determine aspect ratio to use
             if aspect_ratio_override:
                 aspect_ratio = aspect_ratio_override
                 logger.info(f"Using override aspect ratio: {aspect_ratio}")
             else:
-                # Detect aspect ratio from source image
-                with PILImage.open(image_file) as img:
-                    width, height = img.size
-                    aspect = width / height
-
-                    # Map to supported Veo aspect ratios
-                    # Note: Some combinations may not be supported with reference images
-                    if aspect > 1.2:  # Landscape or wide
-                        aspect_ratio = "16:9"
-                    elif aspect > 0.83:  # Square-ish or slightly portrait
-                        aspect_ratio = "16:9"  # Default to landscape for compatibility
-                    else:  # Portrait
-                        aspect_ratio = "16:9"  # Default to landscape for compatibility
-
-                    logger.info(f"Source image: {width}x{height} (aspect: {aspect:.2f}) -> Target: {aspect_ratio}")
+                # Reference images aren't supported with every aspect ratio, so every
+                # source (landscape, square or portrait) is letterboxed into the default
+                aspect_ratio = self.DEFAULT_ASPECT_RATIO
+                logger.info(
+                    f"Source image: {width}x{height} (aspect: {current_aspect:.2f}) -> Target: {aspect_ratio}"
+                )
 
             # Preprocess image to fit target aspect ratio if needed
-            from src.utils.image_utils import fit_image_to_aspect_ratio
+            from src.utils.image_utils import fit_to_aspect_ratio
 
-            with PILImage.open(image_file) as img:
-                width, height = img.size
-                current_aspect = width / height
-                target_aspect_map = {"16:9": 16 / 9, "9:16": 9 / 16, "4:3": 4 / 3, "1:1": 1}
-                target_aspect_value = target_aspect_map.get(aspect_ratio, 16 / 9)
-
-                # Check if preprocessing is needed (allow 5% tolerance)
-                if abs(current_aspect - target_aspect_value) / target_aspect_value > 0.05:
-                    logger.info(f"Preprocessing image to fit {aspect_ratio} aspect ratio (padding mode)...")
-                    processed_image_path = fit_image_to_aspect_ratio(
-                        str(image_file), aspect_ratio, mode="pad", background_color=(0, 0, 0)  # Black letterboxing
-                    )
-                    image_file = Path(processed_image_path)
-                    logger.info(f"Using preprocessed image: {image_file}")
+            target_aspect_map = {"16:9": 16 / 9, "9:16": 9 / 16, "4:3": 4 / 3, "1:1": 1}
+            target_aspect_value = target_aspect_map.get(aspect_ratio, 16 / 9)
 
-            # Use types.Image.from_file() to load the image properly
-            image = types.Image.from_file(location=str(image_file))
+            # Check if preprocessing is needed (allow 5% tolerance)
+            if abs(current_aspect - target_aspect_value) / target_aspect_value > 0.05:
+                logger.info(f"Preprocessing image to fit {aspect_ratio} aspect ratio (padding mode)...")
+                with PILImage.open(image_file) as img:
+                    # Black letterboxing
+                    fitted = fit_to_aspect_ratio(img, aspect_ratio, mode="pad", background_color=(0, 0, 0))
+
+                # Encode straight into the request instead of round-tripping through a file
+                buffer = io.BytesIO()
+                fitted.save(buffer, "JPEG", quality=95)
+                image = types.Image(image_bytes=buffer.getvalue(), mime_type="image/jpeg")
+            else:
+                # Use types.Image.from_file() to load the image properly
+                image = types.Image.from_file(location=str(image_file))
 
             logger.info("Requesting video generation with reference image...")
 
@@ -207,7 +225,8 @@ class Veo3Client:
 
             # Retry logic for transient errors (502, 503, etc.)
             max_retries = 3
-            retry_delay = 30  # Start with 30 seconds
+            base_retry_delay = 30  # Start around 30 seconds, jittered
+            max_retry_delay = 300
             operation = None
 
             for attempt in range(max_retries):
@@ -227,17 +246,14 @@ class Veo3Client:
                 except Exception as e:
                     error_str = str(e)
                     # Check if it's a retryable error (502, 503, 429)
-                    if any(
-                        code in error_str
-                        for code in ["502", "503", "429", "Bad Gateway", "Service Unavailable", "Too Many Requests"]
-                    ):
+                    if _TRANSIENT_ERROR_RE.search(error_str):
                         if attempt < max_retries - 1:
                             logger.warning(
                                 f"Transient error on attempt {attempt + 1}/{max_retries}: {error_str[:100]}..."
                             )
-                            logger.info(f"Retrying in {retry_delay} seconds...")
+                            retry_delay = backoff_delay(attempt, base_retry_delay, max_retry_delay)
+                            logger.info(f"Retrying in {retry_delay:.0f} seconds...")
                             time.sleep(retry_delay)
-                            retry_delay *= 2  # Exponential backoff
                         else:
                             logger.error(f"Failed after {max_retries} attempts")
                             raise VideoGenerationError(f"Failed after {max_retries} retries: {e}") from e
@@ -251,15 +267,17 @@ class Veo3Client:
             logger.info(f"Operation started: {operation.name}")
             logger.info("Waiting for video generation to complete...")
 
-            # Poll operation status
+            # Poll operation status, checking often at first and backing off with jitter
             start_time = time.time()
+            delay = min(self.POLL_INITIAL_DELAY, poll_interval)
             while not operation.done:
                 elapsed = time.time() - start_time
                 if elapsed > timeout:
                     raise VideoGenerationError(f"Video generation timed out after {timeout} seconds")
 
                 logger.debug(f"Waiting... ({int(elapsed)}s elapsed)")
-                time.sleep(poll_interval)
+                time.sleep(delay * random.uniform(1.0, 1.1))
+                delay = min(delay * self.POLL_BACKOFF_FACTOR, poll_interval)
                 operation = self.client.operations.get(operation)
 
             # Check for errors
@@ -282,18 +300,14 @@ class Veo3Client:
             logger.info("Video generated successfully!")
             logger.info("Downloading video...")
 
-            # Download video data from storage (this sets video_bytes property)
-            self.client.files.download(file=video)
-
-            # Now save the video to disk
-            video.video.save(str(output_file))
+            self._download_video(video, output_file)
 
             logger.info(f"Video saved to: {output_path}")
             return str(output_file)
 
         except VideoGenerationError as e:
             # Check if this is a retryable error (no video in response)
-            if "No video in response" in str(e) or "No response" in str(e):
+            if _NO_VIDEO_ERROR_RE.search(str(e)):
                 logger.warning("Veo returned no video - this may be a transient issue")
                 logger.info("You may want to retry this request")
             raise
@@ -303,6 +317,43 @@ class Veo3Client:
             logger.error(f"Video generation failed: {e}")
             raise VideoGenerationError(f"Failed to generate video: {e}") from e
 
+    def _download_video(self, video, output_file: Path):
+        """
+        Save a generated video to disk.
+
+        Streams the file from its download URI in chunks so the whole MP4
+        is never held in memory; falls back to the SDK download otherwise.
+        The stream goes to a temporary file that replaces output_file only
+        once complete, so a failed download never leaves a truncated video.
+
+        Args:
+            video: Generated video from the operation response
+            output_file: Destination path
+        """
+        uri = getattr(video.video, "uri", None)
+        if uri:
+            tmp_file = output_file.with_name(f"{output_file.name}.part")
+            try:
+                with self._session.get(
+                    uri, headers={"x-goog-api-key": self._api_key}, stream=True, timeout=self.DOWNLOAD_TIMEOUT
+                ) as response:
+                    response.raise_for_status()
+                    # iter_content surfaces mid-stream connection errors as RequestException
+                    with open(tmp_file, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                os.replace(tmp_file, output_file)
+                return
+            except (requests.RequestException, OSError) as e:
+                tmp_file.unlink(missing_ok=True)
+                logger.warning(f"Streaming download failed, falling back to SDK download: {e}")
+
+        # Download video data from storage (this sets video_bytes property)
+        self.client.files.download(file=video)
+
+        # Now save the video to disk
+        video.video.save(str(output_file))
+
     def generate_video_async(self, image_path: str, prompt: str, output_path: Optional[str] = None) -> str:
         """
         Generate video asynchronously (returns operation name).
@@ -325,11 +376,13 @@ class Veo3Client:
         image_file = self.validate_image(image_path)
 
         try:
-            # Upload image file to Google's File API
-            uploaded_file = self.client.files.upload(file=str(image_file))
+            from google.genai import types
+
+            # Send the image inline; a Files API upload would cost an extra round trip
+            image = types.Image.from_file(location=str(image_file))
 
-            # Start video generation operation with uploaded file
-            operation = self.client.models.generate_videos(model=self.model_name, prompt=prompt, image=uploaded_file)
+            # Start video generation operation with the inline image
+            operation = self.client.models.generate_videos(model=self.model_name, prompt=prompt, image=image)
 
             logger.info(f"Async operation started: {operation.name}")
             return operation.name
@@ -0,0 +1,488 @@
+"""
+Command-line interface for generating animated videos from photos.
+
+Heavy API and video modules are imported inside run() so that argument
+parsing and --help stay fast.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Backoff bounds for "No video in response" retries (seconds)
+BASE_RETRY_DELAY = 5
+MAX_RETRY_DELAY = 300
+
+# Largest input image accepted before any API call is made
+MAX_IMAGE_PIXELS = 24_000_000
+MAX_IMAGE_SIDE = 8192
+
+# Set by SIGUSR1 (`kill -USR1 <pid>`) to skip the remaining retry delay
+_retry_now = threading.Event()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser for the video generation CLI.
+
+    Returns:
+        Configured ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate Harry Potter style animated video from photo using Veo 3.1",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Basic usage (uses Gemini image analysis by default)
+  %(prog)s portrait.jpg
+
+  # Custom settings
+  %(prog)s portrait.jpg --intensity dramatic --output my_video.mp4
+
+  # Disable Gemini and use standard prompt builder
+  %(prog)s portrait.jpg --no-gemini-prompt
+        """,
+    )
+
+    parser.add_argument("image", help="Path to input image")
+
+    parser.add_argument(
+        "--photo-type",
+        choices=["portrait", "group", "landscape", "pet", "formal"],
+        default="portrait",
+        help="Type of photo (default: portrait)",
+    )
+
+    parser.add_argument(
+        "--intensity",
+        choices=["subtle", "moderate", "dramatic"],
+        default="subtle",
+        help="Animation intensity (default: subtle)",
+    )
+
+    parser.add_argument("--duration", type=int, default=8, help="Video duration in seconds (default: 8)")
+
+    parser.add_argument("--output", "-o", help="Output video path (default: auto-generated)")
+
+    parser.add_argument(
+        "--custom-elements", nargs="+", help='Custom animation elements (e.g., "gentle smile" "soft wind")'
+    )
+
+    parser.add_argument(
+        "--no-loop",
+        action="store_true",
+        help="Disable seamless looping video with crossfade (default: False, looping is enabled by default)",
+    )
+
+    parser.add_argument(
+        "--loop-crossfade",
+        type=float,
+        default=0.5,
+        help="Crossfade duration for looping in seconds (default: 0.5)",
+    )
+
+    parser.add_argument(
+        "--use-veo-loop-frames",
+        action="store_true",
+        help="Use Veo's first/last frame feature for perfect looping (Veo backend only, default: False)",
+    )
+
+    parser.add_argument(
+        "--no-gemini-prompt",
+        action="store_true",
+        help="Disable Gemini image analysis and use standard prompt builder instead (default: False, Gemini is used by default)",
+    )
+
+    parser.add_argument(
+        "--no-bw",
+        action="store_true",
+        help="Disable black & white post-processing, keep color video (default: False, B&W conversion is enabled by default)",
+    )
+
+    parser.add_argument(
+        "--preprocess-bw",
+        action="store_true",
+        help="Convert image to black & white before processing (default: False)",
+    )
+
+    parser.add_argument(
+        "--bw-method",
+        choices=["grayscale", "high_contrast", "vintage"],
+        default="high_contrast",
+        help="Black & white conversion method (default: high_contrast)",
+    )
+
+    parser.add_argument(
+        "--no-gemini-cache",
+        action="store_true",
+        help="Ignore cached Gemini analysis and re-analyze the image (default: False)",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show all prompts and analysis but don't generate video (default: False)",
+    )
+
+    return parser
+
+
+def _tick(message: str):
+    """
+    Show a progress message, updating it in place on a terminal.
+
+    Args:
+        message: Single-line status text
+    """
+    if sys.stdout.isatty():
+        sys.stdout.write("\r\x1b[K" + message)
+    else:
+        sys.stdout.write(message + "\n")
+    sys.stdout.flush()
+
+
+def _precheck_image(image_path: str) -> Optional[str]:
+    """
+    Cheaply validate the input image before spending any API quota.
+
+    Only the image header is read; pixel data is not decoded.
+
+    Args:
+        image_path: Path to input image
+
+    Returns:
+        Error message if the image is unusable, otherwise None
+    """
+    from PIL import Image
+
+    from src.api.veo3_client import Veo3Client
+
+    path = Path(image_path)
+    try:
+        path_stat = path.stat()
+    except OSError:
+        path_stat = None
+    if path_stat is None or not stat.S_ISREG(path_stat.st_mode):
+        return f"Image file not found: {image_path}"
+
+    if path.suffix.lower() not in Veo3Client.SUPPORTED_FORMATS:
+        return f"Unsupported format: {path.suffix}. Supported: {', '.join(sorted(Veo3Client.SUPPORTED_FORMATS))}"
+
+    file_size_mb = path_stat.st_size / (1024 * 1024)
+    if file_size_mb > Veo3Client.MAX_FILE_SIZE_MB:
+        return f"File too large: {file_size_mb:.2f}MB. Maximum: {Veo3Client.MAX_FILE_SIZE_MB}MB"
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.verify()
+    except Exception as e:
+        return f"Invalid image file: {e}"
+
+    if width * height > MAX_IMAGE_PIXELS or max(width, height) > MAX_IMAGE_SIDE:
+        return (
+            f"Image too large: {width}x{height}. "
+            f"Maximum: {MAX_IMAGE_PIXELS // 1_000_000}MP and {MAX_IMAGE_SIDE}px per side"
+        )
+
+    return None
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Generate a video from parsed command-line arguments.
+
+    Args:
+        args: Arguments parsed by build_parser()
+
+    Returns:
+        Process exit code
+    """
+    from src.api.genai_client import get_genai_client
+    from src.prompts.prompt_builder import build_harry_potter_prompt
+    from src.utils.backoff import backoff_delay, interruptible_wait
+    from src.utils.config import Config, setup_logging
+    from src.utils.image_utils import heif_to_jpeg, is_heif
+    from src.video_generator import VideoGenerator
+
+    # Veo doesn't accept HEIC, so phone photos are converted to JPEG once (cached across runs)
+    if is_heif(args.image) and Path(args.image).is_file():
+        try:
+            args.image = str(heif_to_jpeg(args.image))
+        except Exception as e:
+            print(f"❌ Failed to convert HEIC image: {e}")
+            return 2
+
+    # Fail fast on unusable input before loading config or calling any API
+    image_error = _precheck_image(args.image)
+    if image_error:
+        print(f"❌ {image_error}")
+        return 2
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: _retry_now.set())
+
+    # Load config
+    config = Config.from_env()
+    setup_logging(config)
+
+    banner = [
+        "=" * 70,
+        "🧙 Harry Potter Photo Frame Generator",
+        "=" * 70,
+        "Backend: Veo 3.1",
+        f"Image: {args.image}",
+        f"Type: {args.photo_type}",
+        f"Intensity: {args.intensity}",
+        f"Duration: {args.duration}s",
+        "=" * 70,
+        "",
+    ]
+    sys.stdout.write("\n".join(banner) + "\n")
+
+    # Initialize video generator
+    try:
+        # One genai client (and HTTP connection pool) for both Gemini and Veo
+        genai_client = get_genai_client(config.google_api_key)
+        generator = VideoGenerator(google_api_key=config.google_api_key, genai_client=genai_client)
+
+        # Show backend info
+        info = generator.get_backend_info()
+        logger.debug(
+            f"Backend: {info['backend']}, model: {info['model']}, "
+            f"Veo available: {'yes' if info['veo_available'] else 'no'}"
+        )
+
+    except Exception as e:
+        print(f"❌ Failed to initialize video generator: {e}")
+        return 1
+
+    # Preprocess image to B&W if requested
+    working_image_path = args.image
+    # Encoded image for Gemini (kept in memory to avoid re-reading the B&W file)
+    working_image = args.image
+    if args.preprocess_bw:
+        print("🎨 Converting image to black & white...")
+        from src.utils.image_utils import convert_to_black_and_white_bytes
+
+        try:
+            bw_image_bytes, bw_image_path = convert_to_black_and_white_bytes(
+                args.image,
+                method=args.bw_method,
+            )
+            working_image_path = bw_image_path
+            working_image = bw_image_bytes
+            print(f"✅ B&W image created: {bw_image_path}")
+            logger.debug(f"B&W method: {args.bw_method}")
+        except Exception as e:
+            print(f"⚠️  B&W conversion failed: {e}")
+            print("   Using original color image...")
+
+    # Build prompt (use Gemini by default unless --no-gemini-prompt is specified)
+    if not args.no_gemini_prompt:
+        print("🔮 Using Gemini to analyze image and generate contextual prompt...")
+
+        from src.api.gemini_analyzer import GeminiAnalyzer
+        from src.prompts.gemini_templates import build_analyze_and_prompt_request
+
+        try:
+            analyzer = GeminiAnalyzer(
+                api_key=config.google_api_key, genai_client=genai_client, use_cache=not args.no_gemini_cache
+            )
+
+            # Show the request being sent (dry runs and DEBUG logging only)
+            if args.dry_run or logging.getLogger().isEnabledFor(logging.DEBUG):
+                request = build_analyze_and_prompt_request(args.intensity)
+                sys.stdout.write(f"\n📝 Request Being Sent to Gemini:\n{'-' * 70}\n{request}\n{'-' * 70}\n")
+
+            # One request returns both the analysis and the prompt (or neither, if cached).
+            # The analysis streams first as JSON, so it shows as dots; the prompt text
+            # that follows is printed as it is generated.
+            streaming_prompt = []
+
+            def _on_chunk(text: str):
+                if not streaming_prompt:
+                    sys.stdout.write(".")
+                    sys.stdout.flush()
+
+            def _on_prompt_chunk(text: str):
+                if not streaming_prompt:
+                    sys.stdout.write("\n\n✍️  Prompt:\n")
+                streaming_prompt.append(text)
+                sys.stdout.write(text)
+                sys.stdout.flush()
+
+            analysis, prompt = analyzer.analyze_and_prompt(
+                working_image, intensity=args.intensity, on_chunk=_on_chunk, on_prompt_chunk=_on_prompt_chunk
+            )
+            if streaming_prompt:
+                sys.stdout.write("\n")
+
+            analysis_lines = [
+                "",
+                "📊 Image Analysis:",
+                f"  People: {analysis.get('people', 'N/A')}",
+                f"  Objects: {', '.join(analysis.get('objects', []))}",
+                f"  Setting: {analysis.get('setting', 'N/A')}",
+                "",
+                "✨ Magical Suggestions:",
+            ]
+            analysis_lines.extend(
+                f"  {i}. {action}" for i, action in enumerate(analysis.get("magical_actions", []), 1)
+            )
+            sys.stdout.write("\n".join(analysis_lines) + "\n")
+
+        except Exception as e:
+            print(f"⚠️  Gemini analysis failed: {e}")
+            print("   Falling back to standard prompt...")
+            prompt = build_harry_potter_prompt(
+                photo_type=args.photo_type,
+                intensity=args.intensity,
+                duration=args.duration,
+                custom_elements=args.custom_elements,
+            )
+    else:
+        prompt = build_harry_potter_prompt(
+            photo_type=args.photo_type,
+            intensity=args.intensity,
+            duration=args.duration,
+            custom_elements=args.custom_elements,
+        )
+
+    sys.stdout.write(f"\n📜 Final Prompt for Veo:\n{'=' * 70}\n{prompt}\n{'=' * 70}\n\n")
+
+    # Check for dry-run mode
+    if args.dry_run:
+        dry_run_lines = [
+            "=" * 70,
+            "🔍 DRY RUN MODE - Skipping video generation",
+            "=" * 70,
+            "",
+            "All prompts and analysis shown above.",
+            "Remove --dry-run flag to actually generate the video.",
+        ]
+        sys.stdout.write("\n".join(dry_run_lines) + "\n")
+        return 0
+
+    # Generate video with retry logic for "No video in response" errors
+    max_retries = 3
+
+    try:
+        print("🎬 Starting video generation...")
+        start_time = time.monotonic()
+
+        for attempt in range(max_retries):
+            _tick(f"Attempt {attempt + 1}/{max_retries} | elapsed {time.monotonic() - start_time:.0f}s")
+            try:
+                output_path = generator.generate_video(
+                    image_path=working_image_path,
+                    prompt=prompt,
+                    output_path=args.output,
+                    duration=args.duration,
+                    use_loop_frames=args.use_veo_loop_frames,
+                )
+                break  # Success!
+            except Exception as e:
+                error_msg = str(e)
+                if "No video in response" in error_msg and attempt < max_retries - 1:
+                    retry_delay = backoff_delay(attempt, BASE_RETRY_DELAY, MAX_RETRY_DELAY)
+                    logger.debug("Veo returned no video - a known Veo API issue")
+                    _tick(f"Attempt {attempt + 1}/{max_retries} returned no video | retrying in {retry_delay:.0f}s")
+                    interruptible_wait(
+                        retry_delay, wake_event=_retry_now, resume_file=os.environ.get("VEO_RETRY_RESUME_FILE")
+                    )
+                else:
+                    raise  # Re-raise if not retryable or last attempt
+
+        if sys.stdout.isatty():
+            sys.stdout.write("\n")
+        sys.stdout.write(f"\n{'=' * 70}\n✅ SUCCESS!\n{'=' * 70}\n✅ Color video saved to: {output_path}\n")
+
+        # Post-process with ffmpeg. B&W conversion and the color loop are
+        # independent, so run them concurrently; the B&W loop follows once
+        # the B&W video exists. ffmpeg does the work in subprocesses, so
+        # threads are enough to overlap them.
+        from concurrent.futures import ThreadPoolExecutor
+
+        from src.utils.video_utils import convert_video_to_bw, create_looping_video
+
+        steps = []
+        if not args.no_bw:
+            steps.append("🎨 Creating black & white version...")
+        if not args.no_loop:
+            steps.append("🔁 Creating seamless loops...")
+        if steps:
+            sys.stdout.write("\n".join(steps) + "\n")
+
+        bw_output = None
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            bw_future = None
+            color_loop_future = None
+            bw_loop_future = None
+
+            # Create B&W version by default (unless --no-bw)
+            if not args.no_bw:
+                bw_output = output_path.replace(".mp4", "_bw.mp4")
+                bw_future = executor.submit(convert_video_to_bw, output_path, bw_output, method=args.bw_method)
+
+            # Loop the color version (unless --no-loop)
+            if not args.no_loop:
+                color_loop_future = executor.submit(
+                    create_looping_video,
+                    output_path,
+                    output_path=output_path.replace(".mp4", "_loop.mp4"),
+                    crossfade_duration=args.loop_crossfade,
+                )
+
+            if bw_future:
+                try:
+                    bw_future.result()
+                    print(f"✅ B&W video saved to: {bw_output}")
+                except Exception as e:
+                    print(f"⚠️  Warning: Failed to create B&W version: {e}")
+                    print("   (Color video is still available)")
+                    bw_output = None
+
+            # Loop the B&W version if it was created
+            if bw_output and not args.no_loop:
+                bw_loop_future = executor.submit(
+                    create_looping_video,
+                    bw_output,
+                    output_path=bw_output.replace(".mp4", "_loop.mp4"),
+                    crossfade_duration=args.loop_crossfade,
+                )
+
+            if color_loop_future:
+                try:
+                    color_loop_path = color_loop_future.result()
+                    print(f"✅ Color looping video saved to: {color_loop_path}")
+                except Exception as e:
+                    print(f"⚠️  Warning: Failed to create color looping video: {e}")
+
+            if bw_loop_future:
+                try:
+                    bw_loop_path = bw_loop_future.result()
+                    print(f"✅ B&W looping video saved to: {bw_loop_path}")
+                except Exception as e:
+                    print(f"⚠️  Warning: Failed to create B&W looping video: {e}")
+
+        print("=" * 70)
+
+        return 0
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Generation interrupted by user")
+        return 1
+    except Exception as e:
+        print(f"\n❌ Video generation failed: {e}")
+        return 1
+
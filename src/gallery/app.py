@@ -4,80 +4,199 @@ Magical Portrait Gallery - Flask Web Application
 Displays animated Harry Potter-style portraits with interaction detection.
 """
 
+import json
 import logging
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-from flask import Flask, jsonify, render_template, request, send_from_directory
+from flask import Flask, Response, jsonify, render_template, request, send_from_directory
 
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config["OUTPUT_DIR"] = Path(__file__).parent.parent.parent / "output"
 
+VIDEO_SUFFIXES = {".mp4", ".mov"}
+
+# Loops and B&W versions are regenerated in place under the same names, so browsers
+# reuse a video only briefly and then revalidate it by ETag (a cheap 304 when unchanged)
+VIDEO_CACHE_MAX_AGE = 60
+
+# How long browsers may reuse an /api/portraits response before asking again
+PORTRAITS_API_MAX_AGE = 5
+
+# (output dir, dir mtime_ns, portraits newest first, serialized JSON by item count,
+# (path, mtime_ns) of each listed video) from the last directory scan
+_PortraitsCacheEntry = Tuple[Path, int, List["Portrait"], Dict[int, bytes], Tuple[Tuple[Path, int], ...]]
+_portraits_cache: Optional[_PortraitsCacheEntry] = None
+_portraits_lock = threading.Lock()
+
 
 class Portrait:
     """Represents a magical portrait with its video and metadata."""
 
-    def __init__(self, video_path: Path):
+    def __init__(self, video_path: Path, mtime: Optional[float] = None):
         self.video_path = video_path
         self.name = video_path.stem
         self.filename = video_path.name
-        self.created = datetime.fromtimestamp(video_path.stat().st_mtime)
+        self.created = datetime.fromtimestamp(video_path.stat().st_mtime if mtime is None else mtime)
         self.is_loop = "_loop" in self.name
         # Keep version info in base_name for display (only strip _loop suffix)
         self.base_name = self.name.replace("_loop", "")
+        self._dict: Optional[dict] = None
 
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
-        return {
-            "name": self.base_name,
-            "filename": self.filename,
-            "video_url": f"/videos/{self.filename}",
-            "created": self.created.isoformat(),
-            "is_looking": False,  # Will be tracked in session
-        }
+        # Portraits outlive a request (see get_latest_portraits), so build this once
+        if self._dict is None:
+            self._dict = {
+                "name": self.base_name,
+                "filename": self.filename,
+                "video_url": f"/videos/{self.filename}",
+                "created": self.created.isoformat(),
+                "is_looking": False,  # Will be tracked in session
+            }
+        return self._dict
 
 
 def get_latest_portraits(limit: int = 10) -> List[Portrait]:
     """
     Get the most recent portrait videos.
 
+    The directory is rescanned only when its mtime changes (i.e. a video was
+    added, removed or renamed) or a listed video was rewritten in place;
+    otherwise the previous scan is reused.
+
     Args:
         limit: Maximum number of portraits to return
 
     Returns:
         List of Portrait objects, sorted by creation time (newest first)
     """
+    cached = _current_portraits()
+    if cached is None:
+        return []
+    return cached[2][:limit]
+
+
+def get_latest_portraits_json(limit: int = 10) -> bytes:
+    """
+    Get the most recent portraits as a serialized JSON array.
+
+    The encoded response is cached alongside the directory scan, so repeated
+    API polls skip serialization until a video is added, removed or rewritten.
+
+    Args:
+        limit: Maximum number of portraits to return
+
+    Returns:
+        UTF-8 encoded JSON array of portrait dictionaries
+    """
+    cached = _current_portraits()
+    if cached is None:
+        return b"[]"
+
+    portraits = cached[2][:limit]
+    # Results are prefixes of the same list, so their length identifies them
+    json_by_count = cached[3]
+    data = json_by_count.get(len(portraits))
+    if data is None:
+        data = json.dumps([p.to_dict() for p in portraits], separators=(",", ":")).encode()
+        json_by_count[len(portraits)] = data
+    return data
+
+
+def _current_portraits() -> Optional[_PortraitsCacheEntry]:
+    """
+    Return the cached directory scan, rescanning if the output dir or a listed video changed.
+
+    Returns:
+        Cache entry, or None if the output directory doesn't exist
+    """
+    global _portraits_cache
+
     output_dir = app.config["OUTPUT_DIR"]
 
-    if not output_dir.exists():
+    try:
+        dir_mtime_ns = output_dir.stat().st_mtime_ns
+    except FileNotFoundError:
         logger.warning(f"Output directory not found: {output_dir}")
-        return []
+        return None
 
-    # Find all video files
-    video_files = []
-    for ext in ["*.mp4", "*.mov"]:
-        video_files.extend(output_dir.glob(ext))
+    with _portraits_lock:
+        cached = _portraits_cache
+        if (
+            cached is None
+            or cached[0] != output_dir
+            or cached[1] != dir_mtime_ns
+            or not _files_unchanged(cached[4])
+        ):
+            portraits, file_mtimes = _scan_portraits(output_dir)
+            cached = (output_dir, dir_mtime_ns, portraits, {}, file_mtimes)
+            _portraits_cache = cached
 
-    # Prefer _loop versions for each unique base_name
-    portraits_dict = {}
-    for video_file in video_files:
-        portrait = Portrait(video_file)
+    return cached
 
-        # Use base_name as key (which now includes version info like v2, v3, full_magical)
-        # This allows multiple versions of the same person to appear
-        if portrait.base_name not in portraits_dict:
-            portraits_dict[portrait.base_name] = portrait
-        elif portrait.is_loop and not portraits_dict[portrait.base_name].is_loop:
-            # Replace non-loop with loop version
-            portraits_dict[portrait.base_name] = portrait
 
-    # Sort by creation time, newest first
-    portraits = sorted(portraits_dict.values(), key=lambda p: p.created, reverse=True)
+def _files_unchanged(file_mtimes: Tuple[Tuple[Path, int], ...]) -> bool:
+    """
+    Check that listed videos were not rewritten in place since they were scanned.
+
+    Overwriting a file (e.g. ffmpeg -y regenerating a loop) changes its mtime
+    but not the directory's, so each listed file is checked individually.
+
+    Args:
+        file_mtimes: (path, mtime_ns) pairs recorded by the scan
+
+    Returns:
+        True if every file still exists with the recorded mtime
+    """
+    try:
+        return all(path.stat().st_mtime_ns == mtime_ns for path, mtime_ns in file_mtimes)
+    except FileNotFoundError:
+        return False
 
-    return portraits[:limit]
+
+def _scan_portraits(output_dir: Path) -> Tuple[List[Portrait], Tuple[Tuple[Path, int], ...]]:
+    """
+    Build the portrait list from a single pass over the output directory.
+
+    Args:
+        output_dir: Directory containing generated videos
+
+    Returns:
+        Tuple of (Portrait objects sorted by creation time, newest first;
+        (path, mtime_ns) of each listed video)
+    """
+    # Pick one file per base_name from names alone, preferring _loop versions,
+    # so only the chosen files pay for a stat()
+    chosen: Dict[str, os.DirEntry] = {}
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            stem, suffix = os.path.splitext(entry.name)
+            if suffix not in VIDEO_SUFFIXES or not entry.is_file():
+                continue
+
+            # Use base_name as key (which now includes version info like v2, v3, full_magical)
+            # This allows multiple versions of the same person to appear
+            base_name = stem.replace("_loop", "")
+            current = chosen.get(base_name)
+            if current is None or ("_loop" in stem and "_loop" not in current.name):
+                chosen[base_name] = entry
+
+    portraits = []
+    file_mtimes = []
+    for entry in chosen.values():
+        stat = entry.stat()
+        path = Path(entry.path)
+        portraits.append(Portrait(path, mtime=stat.st_mtime))
+        file_mtimes.append((path, stat.st_mtime_ns))
+
+    # Sort by creation time, newest first
+    return sorted(portraits, key=lambda p: p.created, reverse=True), tuple(file_mtimes)
 
 
 @app.route("/")
@@ -91,8 +210,10 @@ def index():
 def api_portraits():
     """API endpoint to get portrait list."""
     limit = request.args.get("limit", 10, type=int)
-    portraits = get_latest_portraits(limit=limit)
-    return jsonify([p.to_dict() for p in portraits])
+    response = Response(get_latest_portraits_json(limit=limit), mimetype="application/json")
+    response.cache_control.max_age = PORTRAITS_API_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
 
 
 @app.route("/api/portrait/<portrait_name>/looking", methods=["POST"])
@@ -124,7 +245,13 @@ def portrait_looking(portrait_name: str):
 @app.route("/videos/<path:filename>")
 def serve_video(filename: str):
     """Serve video files from output directory."""
-    return send_from_directory(app.config["OUTPUT_DIR"], filename)
+    # Conditional responses give 304s on revalidation and 206s for <video> seeking
+    response = send_from_directory(
+        app.config["OUTPUT_DIR"], filename, conditional=True, etag=True, max_age=VIDEO_CACHE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
 
 
 @app.route("/health")
@@ -147,6 +274,7 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", default=5000, type=int, help="Port to bind to")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("--threads", default=16, type=int, help="Worker threads when served by waitress")
 
     args = parser.parse_args()
 
@@ -158,7 +286,19 @@ def main():
     logger.info(f"Starting Magical Portrait Gallery on {args.host}:{args.port}")
     logger.info(f"Output directory: {app.config['OUTPUT_DIR']}")
 
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+        return
+
+    # Each playing <video> holds open range requests, so serve with a real thread pool when available
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.info("waitress not installed; using Flask's threaded server (pip install waitress)")
+        app.run(host=args.host, port=args.port, threaded=True)
+        return
+
+    serve(app, host=args.host, port=args.port, threads=args.threads)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+"""
+Prompt templates for Gemini image analysis.
+
+Shared by GeminiAnalyzer and the CLI so the text sent to Gemini and the
+text shown to the user are built once and never drift apart.
+"""
+
+from string import Template
+
+# Bump whenever a template changes so cached Gemini results are not reused
+PROMPT_VERSION = "2"
+
+# What Gemini should look for in the photo
+_ANALYSIS_INSTRUCTIONS = """Analyze this photograph for creating a magical Harry Potter-style animated portrait.
+
+Please identify:
+
+1. PEOPLE: Describe each person (appearance, clothing, position, expression)
+2. OBJECTS: List specific objects they could interact with (in hands, nearby, in background)
+3. SETTING: Describe the location/environment
+4. MAGICAL INTERACTIONS: Suggest 5-7 SUBTLE creative magical actions ONLY using objects already in the photo:
+   - SUBTLE movements: objects gently floating, swaying, or shifting position
+   - Existing objects subtly transforming or changing
+   - Objects responding to gestures in understated ways
+   - Things already in the photo coming alive with MINIMAL animation
+   - People interacting with each other (whispering, gesturing, glancing, small smiles)
+   - People turning to face the camera and speaking/gesturing to the viewer
+   - People acknowledging the camera viewer's presence with subtle expressions
+   - AVOID: Magical dust, sparkles, glowing lights, obvious magical effects, wisps, or auras
+   - IMPORTANT: Do NOT suggest adding new objects, creatures, or elements that aren't in the photo
+   - EMPHASIS: Keep effects vintage and understated, like old magical photographs
+
+Be specific about which EXISTING objects they should interact with and how people interact with each other and the viewer!"""
+
+# Static request asking Gemini to describe the photo
+ANALYSIS_PROMPT = (
+    _ANALYSIS_INSTRUCTIONS
+    + """
+
+Respond with ONLY a JSON object of this form:
+{
+  "people": "descriptions",
+  "objects": ["specific item", "..."],
+  "setting": "description",
+  "magical_actions": ["specific SUBTLE magical interaction", "... (5-7 in total)"]
+}"""
+)
+
+# Rules for the Veo prompt Gemini writes. Placeholder: $intensity
+_PROMPT_RULES = """IMPORTANT INSTRUCTION STYLE:
+- Write as SPECIFIC INSTRUCTIONS to a video generator, not a general description
+- Use definite articles: "THE blonde woman", "THE man in the blue shirt", "THE book on the table", "THE dog", "THE cat"
+- NOT: "a person smiles" but "the blonde woman smiles at the camera"
+- NOT: "someone waves" but "the tall man in the grey suit waves his right hand"
+- Be CONCRETE and SPECIFIC about who does what, referencing their appearance from the analysis
+- CRITICAL: MAXIMIZE interactions between ALL characters (people, animals, pets, etc.)
+- If there are multiple people/animals, they MUST interact frequently - looking at each other, touching, gesturing, reacting
+- Animals should interact with people and other animals
+- Create a sense of CONNECTION and RELATIONSHIP between all subjects
+
+Create a $intensity animation prompt with these requirements:
+1. Maintains the original photo's colors and aesthetic - vintage photograph style
+2. NO FRAMES or BORDERS - photograph only
+3. Use SPECIFIC references: "the [hair color] [man/woman] with [clothing/feature]" does [action]
+4. At least one person ALWAYS looking directly at camera throughout - specify WHICH person by their appearance
+5. Include 2-3 of the suggested magical interactions - be specific about WHICH objects and WHO interacts with them
+6. MANDATORY: If multiple people/animals/characters are present, they MUST interact extensively:
+   - "the woman in red leans toward the bearded man and whispers in his ear"
+   - "the golden retriever nuzzles against the man's leg while he pets its head"
+   - "the woman glances at the man, who smiles back at her"
+   - "the cat rubs against the child's arm as the child reaches to pet it"
+   - Specify WHO does WHAT to WHOM using their specific descriptions
+7. Describe viewer interactions specifically: "the blonde woman turns her gaze to the camera and smirks"
+8. Balance interactions: mix character-to-character AND character-to-viewer interactions
+9. Seamlessly loops from end to beginning
+10. Keeps background mostly static
+11. 8 seconds duration
+12. CRITICAL: DO NOT add any new objects or creatures that aren't already visible in the photo
+13. ONLY animate or make magical the objects, people, and elements that are ALREADY in the photo
+14. Objects can move subtly, shift position, or interact, but nothing new should appear
+15. SUBTLETY IS KEY: Avoid magical dust, sparkles, glowing lights, wisps, auras, or obvious magical effects
+16. Keep all effects UNDERSTATED and VINTAGE - like subtle movements in an old magical photograph
+17. Focus on expressions, gestures, small movements, and natural interactions rather than flashy effects"""
+
+# Request turning an analysis into a Veo prompt.
+# Placeholders: $people, $objects, $setting, $actions, $intensity
+PROMPT_REQUEST_TEMPLATE = Template(
+    """Based on this image analysis, create a detailed animation prompt for Veo video generation.
+
+ANALYSIS:
+People: $people
+Objects: $objects
+Setting: $setting
+Suggested magical actions: $actions
+
+"""
+    + _PROMPT_RULES
+    + """
+
+Write ONLY the animation prompt as specific video generation instructions. Use "the [specific person]" language throughout!"""
+)
+
+# Single request returning both the analysis and the Veo prompt as JSON.
+# Placeholder: $intensity
+ANALYZE_AND_PROMPT_TEMPLATE = Template(
+    _ANALYSIS_INSTRUCTIONS
+    + """
+
+Then, using your analysis, write an animation prompt for Veo video generation.
+
+"""
+    + _PROMPT_RULES
+    + """
+
+Respond with ONLY a JSON object of this form:
+{
+  "analysis": {
+    "people": "descriptions",
+    "objects": ["specific item", "..."],
+    "setting": "description",
+    "magical_actions": ["specific SUBTLE magical interaction", "..."]
+  },
+  "magical_prompt": "the animation prompt, written as specific video generation instructions"
+}"""
+)
+
+
+def build_prompt_request(analysis: dict, intensity: str) -> str:
+    """
+    Fill the prompt-request template from an analysis result.
+
+    Args:
+        analysis: Parsed analysis dictionary
+        intensity: Animation intensity (subtle, moderate, dramatic)
+
+    Returns:
+        Prompt-generation request text
+    """
+    return PROMPT_REQUEST_TEMPLATE.substitute(
+        people=analysis.get("people", "person in photo"),
+        objects=analysis.get("objects", "various objects"),
+        setting=analysis.get("setting", "scene"),
+        actions=analysis.get("magical_actions", []),
+        intensity=intensity,
+    )
+
+
+def build_analyze_and_prompt_request(intensity: str) -> str:
+    """
+    Fill the combined analysis-and-prompt template.
+
+    Args:
+        intensity: Animation intensity (subtle, moderate, dramatic)
+
+    Returns:
+        Combined request text
+    """
+    return ANALYZE_AND_PROMPT_TEMPLATE.substitute(intensity=intensity)
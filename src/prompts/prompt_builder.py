@@ -7,12 +7,13 @@ magical portrait animations reminiscent of Harry Potter photographs.
 
 import logging
 from enum import Enum
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
 
-class AnimationIntensity(Enum):
+class AnimationIntensity(str, Enum):
     """Animation intensity levels."""
 
     SUBTLE = "subtle"
@@ -20,7 +21,7 @@ class AnimationIntensity(Enum):
     DRAMATIC = "dramatic"
 
 
-class PhotoType(Enum):
+class PhotoType(str, Enum):
     """Types of photos to animate."""
 
     PORTRAIT = "portrait"
@@ -30,6 +31,18 @@ class PhotoType(Enum):
     FORMAL = "formal"
 
 
+# Lookup from lowercase option strings (the enum values) to enum members
+_PHOTO_TYPES = {member.value: member for member in PhotoType}
+_INTENSITIES = {member.value: member for member in AnimationIntensity}
+
+
+# Fixed text around the description in PromptBuilder.build_simple_prompt()
+_SIMPLE_PREFIX = "Animate this photograph as a magical Harry Potter style portrait. "
+_SIMPLE_MIDDLE = (
+    ". Maintain cinematic quality, magical atmosphere, keep background static, preserve original photo details. "
+)
+
+
 class PromptBuilder:
     """Builder for Harry Potter style animation prompts."""
 
@@ -158,6 +171,32 @@ class PromptBuilder:
         "classic portrait aesthetic",
     ]
 
+    # Fixed prompt fragments, joined once when the class is defined
+    _BASE_STR = ", ".join(BASE_QUALITIES)
+    _CORE_STR = ", ".join(CORE_REQUIREMENTS)
+    _ENV_STR = ", ".join(ENVIRONMENTAL_EFFECTS[:2])
+    _LOOP_STR = (
+        "smooth seamless loop from end back to beginning, "
+        "keep background static, "
+        "preserve original photograph character and quality"
+    )
+
+    # Movement selections per intensity, with matching viewer interactions and emotions
+    _SUBTLE_SELECTION = tuple(SUBTLE_MOVEMENTS[:3] + VIEWER_INTERACTIONS[:2] + EMOTIONAL_EXPRESSIONS[:2])
+    _MODERATE_SELECTION = tuple(MODERATE_MOVEMENTS[:3] + VIEWER_INTERACTIONS[2:5] + EMOTIONAL_EXPRESSIONS[2:5])
+    _DRAMATIC_SELECTION = tuple(DRAMATIC_MOVEMENTS[:4] + VIEWER_INTERACTIONS[5:8] + EMOTIONAL_EXPRESSIONS[5:8])
+    _GROUP_SELECTION = tuple(GROUP_INTERACTIONS[:3])
+
+    # Full movement list by (intensity, is group photo)
+    _MOVEMENTS = {
+        (AnimationIntensity.SUBTLE, False): _SUBTLE_SELECTION,
+        (AnimationIntensity.SUBTLE, True): _SUBTLE_SELECTION + _GROUP_SELECTION,
+        (AnimationIntensity.MODERATE, False): _MODERATE_SELECTION,
+        (AnimationIntensity.MODERATE, True): _MODERATE_SELECTION + _GROUP_SELECTION,
+        (AnimationIntensity.DRAMATIC, False): _DRAMATIC_SELECTION,
+        (AnimationIntensity.DRAMATIC, True): _DRAMATIC_SELECTION + _GROUP_SELECTION,
+    }
+
     def __init__(self, duration: int = 8):
         """
         Initialize prompt builder.
@@ -166,7 +205,7 @@ class PromptBuilder:
             duration: Video duration in seconds (default: 8)
         """
         self.duration = duration
-        logger.debug(f"PromptBuilder initialized with duration: {duration}s")
+        logger.debug("PromptBuilder initialized with duration: %ss", duration)
 
     def build_prompt(
         self,
@@ -184,6 +223,34 @@ class PromptBuilder:
             custom_elements: Optional list of custom animation elements
             include_audio: Whether to include audio suggestions
 
+        Returns:
+            Formatted prompt string for video generation
+        """
+        # Prompts depend only on these arguments, and a run renders many photos with the same settings
+        prompt = _build_prompt_cached(
+            type(self), photo_type, intensity, self.duration, tuple(custom_elements or ()), include_audio
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Built prompt: {prompt[:100]}...")
+        return prompt
+
+    def _compose_prompt(
+        self,
+        photo_type: PhotoType,
+        intensity: AnimationIntensity,
+        custom_elements: Sequence[str],
+        include_audio: bool,
+    ) -> str:
+        """
+        Assemble the prompt text (uncached body of build_prompt()).
+
+        Args:
+            photo_type: Type of photo being animated
+            intensity: Animation intensity level
+            custom_elements: Custom animation elements (may be empty)
+            include_audio: Whether to include audio suggestions
+
         Returns:
             Formatted prompt string for video generation
         """
@@ -193,10 +260,10 @@ class PromptBuilder:
         prompt_parts.append(self._get_photo_intro(photo_type))
 
         # Add base qualities (includes black and white, no frames)
-        prompt_parts.append(", ".join(self.BASE_QUALITIES))
+        prompt_parts.append(self._BASE_STR)
 
         # ALWAYS add core requirements (direct camera gaze)
-        prompt_parts.append(", ".join(self.CORE_REQUIREMENTS))
+        prompt_parts.append(self._CORE_STR)
 
         # Add movements based on intensity
         movements = self._get_movements(intensity, photo_type)
@@ -206,26 +273,19 @@ class PromptBuilder:
 
         # Add environmental effects for vintage feel
         if intensity != AnimationIntensity.DRAMATIC:
-            prompt_parts.append(", ".join(self.ENVIRONMENTAL_EFFECTS[:2]))
+            prompt_parts.append(self._ENV_STR)
 
         # Add duration constraint
         prompt_parts.append(f"{self.duration} seconds duration")
 
         # Add stability and looping instructions
-        prompt_parts.append(
-            "smooth seamless loop from end back to beginning, "
-            "keep background static, "
-            "preserve original photograph character and quality"
-        )
+        prompt_parts.append(self._LOOP_STR)
 
         # Add audio if requested
         if include_audio:
             prompt_parts.append("ambient magical sound atmosphere")
 
-        prompt = ". ".join(prompt_parts) + "."
-
-        logger.debug(f"Built prompt: {prompt[:100]}...")
-        return prompt
+        return ". ".join(prompt_parts) + "."
 
     def _get_photo_intro(self, photo_type: PhotoType) -> str:
         """
@@ -257,30 +317,8 @@ class PromptBuilder:
         Returns:
             List of movement descriptions
         """
-        movements = []
-
-        # Get base movements based on intensity
-        if intensity == AnimationIntensity.SUBTLE:
-            movements = self.SUBTLE_MOVEMENTS[:3]  # Use first 3 subtle movements
-            # Add subtle viewer interactions and emotions
-            movements.extend(self.VIEWER_INTERACTIONS[:2])
-            movements.extend(self.EMOTIONAL_EXPRESSIONS[:2])
-        elif intensity == AnimationIntensity.MODERATE:
-            movements = self.MODERATE_MOVEMENTS[:3]  # Use first 3 moderate movements
-            # Add moderate viewer interactions and emotions
-            movements.extend(self.VIEWER_INTERACTIONS[2:5])
-            movements.extend(self.EMOTIONAL_EXPRESSIONS[2:5])
-        else:  # DRAMATIC
-            movements = self.DRAMATIC_MOVEMENTS[:4]  # Use first 4 dramatic movements
-            # Add dramatic viewer interactions and emotions
-            movements.extend(self.VIEWER_INTERACTIONS[5:8])
-            movements.extend(self.EMOTIONAL_EXPRESSIONS[5:8])
-
-        # Add group interactions if it's a group photo
-        if photo_type == PhotoType.GROUP:
-            movements.extend(self.GROUP_INTERACTIONS[:3])
-
-        return movements
+        # Group photos also get group interactions
+        return list(self._MOVEMENTS[(intensity, photo_type == PhotoType.GROUP)])
 
     def build_simple_prompt(self, description: str) -> str:
         """
@@ -292,13 +330,33 @@ class PromptBuilder:
         Returns:
             Formatted prompt string
         """
-        return (
-            f"Animate this photograph as a magical Harry Potter style portrait. "
-            f"{description}. "
-            f"Maintain cinematic quality, magical atmosphere, "
-            f"keep background static, preserve original photo details. "
-            f"{self.duration} seconds duration."
-        )
+        return f"{_SIMPLE_PREFIX}{description}{_SIMPLE_MIDDLE}{self.duration} seconds duration."
+
+
+@lru_cache(maxsize=256)
+def _build_prompt_cached(
+    builder_cls: type,
+    photo_type: PhotoType,
+    intensity: AnimationIntensity,
+    duration: int,
+    custom_elements: Tuple[str, ...],
+    include_audio: bool,
+) -> str:
+    """
+    Memoized prompt construction shared by all PromptBuilder instances.
+
+    Args:
+        builder_cls: PromptBuilder (sub)class whose constants define the prompt
+        photo_type: Type of photo being animated
+        intensity: Animation intensity level
+        duration: Video duration in seconds
+        custom_elements: Custom animation elements (may be empty)
+        include_audio: Whether to include audio suggestions
+
+    Returns:
+        Formatted prompt string for video generation
+    """
+    return builder_cls(duration=duration)._compose_prompt(photo_type, intensity, custom_elements, include_audio)
 
 
 def build_harry_potter_prompt(
@@ -324,15 +382,13 @@ def build_harry_potter_prompt(
         >>> print(prompt)
         Animate this portrait as a magical Harry Potter photograph...
     """
-    try:
-        photo_enum = PhotoType[photo_type.upper()]
-    except KeyError:
+    photo_enum = _PHOTO_TYPES.get(photo_type.lower())
+    if photo_enum is None:
         logger.warning(f"Invalid photo_type: {photo_type}, using PORTRAIT")
         photo_enum = PhotoType.PORTRAIT
 
-    try:
-        intensity_enum = AnimationIntensity[intensity.upper()]
-    except KeyError:
+    intensity_enum = _INTENSITIES.get(intensity.lower())
+    if intensity_enum is None:
         logger.warning(f"Invalid intensity: {intensity}, using SUBTLE")
         intensity_enum = AnimationIntensity.SUBTLE
 
@@ -0,0 +1,77 @@
+"""
+Backoff helpers for retrying transient API failures.
+
+Provides capped exponential backoff with randomized jitter so that
+concurrent runners do not retry in lockstep, and an interruptible wait
+that lets an operator cut a retry delay short.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, max_exponent: int = 6) -> float:
+    """
+    Compute a jittered, capped exponential backoff delay.
+
+    Args:
+        attempt: Zero-based retry attempt number
+        base_delay: Delay for the first retry in seconds
+        max_delay: Upper bound for the un-jittered delay in seconds
+        max_exponent: Cap on the exponent to avoid huge intermediate values
+
+    Returns:
+        Delay in seconds, randomized to 50%-150% of the capped exponential value
+    """
+    delay = min(max_delay, base_delay * (2 ** min(attempt, max_exponent)))
+    return delay * random.uniform(0.5, 1.5)
+
+
+def interruptible_wait(
+    seconds: float,
+    wake_event: Optional[threading.Event] = None,
+    resume_file: Optional[str] = None,
+    poll_interval: float = 1.0,
+) -> bool:
+    """
+    Wait up to `seconds`, returning early when asked to resume.
+
+    The wait ends early if `wake_event` is set (e.g. from a signal handler)
+    or if `resume_file` appears on disk. The resume file is removed once
+    consumed so that it only skips one wait.
+
+    Args:
+        seconds: Maximum time to wait
+        wake_event: Optional event that ends the wait when set (cleared on wake)
+        resume_file: Optional path whose existence ends the wait
+        poll_interval: How often to check for the resume file
+
+    Returns:
+        True if woken early, False if the full delay elapsed
+    """
+    event = wake_event or threading.Event()
+    deadline = time.monotonic() + seconds
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+
+        if event.wait(min(poll_interval, remaining)):
+            event.clear()
+            logger.info("Retry wait interrupted - resuming now")
+            return True
+
+        if resume_file and os.path.exists(resume_file):
+            try:
+                os.remove(resume_file)
+            except OSError:
+                pass
+            logger.info(f"Resume file found ({resume_file}) - resuming now")
+            return True
@@ -16,9 +16,9 @@ from dotenv import load_dotenv
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Config:
-    """Application configuration."""
+    """Application configuration (immutable, so it can key caches)."""
 
     google_api_key: str
     openai_api_key: Optional[str] = None
@@ -40,7 +40,7 @@ class Config:
         valid_levels = {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
         if self.log_level.upper() not in valid_levels:
             logger.warning(f"Invalid log level: {self.log_level}. Using INFO.")
-            self.log_level = "INFO"
+            object.__setattr__(self, "log_level", "INFO")
 
         logger.debug(f"Configuration initialized: output_dir={self.output_dir}")
 
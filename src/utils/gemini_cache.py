@@ -0,0 +1,172 @@
+"""
+Persistent cache for Gemini image analysis results.
+
+Results are stored in a small SQLite database keyed by a hash of the image
+content, so re-running the same photo skips the Gemini round trips.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "magical-photos" / "gemini.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 86400
+DEFAULT_MAX_ENTRIES = 500
+
+
+def image_cache_key(image: Union[str, bytes], *parts: str) -> str:
+    """
+    Build a cache key from the image content and extra qualifiers.
+
+    Args:
+        image: Path to image file, or encoded image bytes
+        *parts: Additional key components (e.g. intensity)
+
+    Returns:
+        Cache key string
+    """
+    return ":".join([image_digest(image), *parts])
+
+
+def image_digest(image: Union[str, bytes]) -> str:
+    """
+    Hash image content for use in cache keys.
+
+    File digests are memoized by (path, mtime, size), so the several keys
+    built for one request read and hash the file at most once.
+
+    Args:
+        image: Path to image file, or encoded image bytes
+
+    Returns:
+        Hex digest of the image content
+    """
+    if isinstance(image, bytes):
+        return hashlib.blake2b(image, digest_size=16).hexdigest()
+
+    image_file = Path(image).resolve()
+    stat = image_file.stat()
+    return _file_digest(str(image_file), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    """
+    Hash a file's content; mtime_ns and size only key the memoization.
+
+    Args:
+        path: Resolved path to the file
+        mtime_ns: Modification time of the file in nanoseconds
+        size: File size in bytes
+
+    Returns:
+        Hex digest of the file content
+    """
+    return hashlib.blake2b(Path(path).read_bytes(), digest_size=16).hexdigest()
+
+
+class GeminiCache:
+    """SQLite-backed TTL cache for JSON-serializable Gemini results."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path to SQLite database (default: ~/.cache/magical-photos/gemini.sqlite)
+            ttl_seconds: Maximum age of an entry before it is ignored (default: 7 days)
+            max_entries: Maximum number of entries kept (oldest evicted first)
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # Analyses may run on worker threads; serialize access to the connection
+        self._lock = threading.Lock()
+        # None when the database could not be opened: every lookup misses and nothing is stored
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.close()
+                raise
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Failed to open Gemini cache {self.db_path}, caching disabled: {e}")
+            return
+        self._conn = conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None on miss, expiry, or read failure
+        """
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+
+                value, created = row
+                if time.time() - created > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+
+            logger.debug(f"Gemini cache hit: {key}")
+            return json.loads(value)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Failed to read Gemini cache: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        """
+        Store a value, evicting the oldest entries beyond max_entries.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key NOT IN (SELECT key FROM cache ORDER BY created DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._conn.commit()
+        except (sqlite3.Error, TypeError) as e:
+            logger.warning(f"Failed to write Gemini cache: {e}")
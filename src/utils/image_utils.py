@@ -5,15 +5,73 @@ This module provides utilities for resizing, cropping, and padding images
 to match target aspect ratios without distortion.
 """
 
+import hashlib
+import io
 import logging
+import os
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Literal, Tuple
+from typing import Callable, List, Literal, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 from PIL import Image, ImageOps
 
+try:
+    # Optional: lets Pillow open HEIC/HEIF photos straight off a phone
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+HEIF_SUFFIXES = {".heic", ".heif"}
+HEIF_JPEG_CACHE_DIR = Path.home() / ".cache" / "magical-photos" / "jpeg"
+
+# Output directories this process has already created
+_ENSURED_DIRS: Set[Path] = set()
+
+# Supported aspect ratios as (width, height) proportions
+ASPECT_RATIOS = {
+    "16:9": (16, 9),
+    "9:16": (9, 16),
+    "4:3": (4, 3),
+    "3:4": (3, 4),
+    "1:1": (1, 1),
+}
+
+# Resampling filter per resize quality tier: "fast" for previews, "high" for final output
+RESAMPLING_FILTERS = {"fast": Image.Resampling.BILINEAR, "high": Image.Resampling.LANCZOS}
+
+# JPEG settings for speed paths: 4:2:0 chroma subsampling and no extra optimization passes
+FAST_JPEG_OPTIONS = {"quality": 90, "subsampling": 2, "optimize": False, "progressive": False}
+
+# EXIF tag whose value (other than 1) asks viewers to rotate or flip the image
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def _jpeg_save_options(save_quality: int, fast_save: bool) -> dict:
+    """
+    Build Image.save() keyword arguments for a JPEG output.
+
+    Args:
+        save_quality: JPEG quality used when not saving fast
+        fast_save: Use FAST_JPEG_OPTIONS instead (overrides save_quality)
+
+    Returns:
+        Keyword arguments for Image.save()
+    """
+    return dict(FAST_JPEG_OPTIONS) if fast_save else {"quality": save_quality}
+
 
+@lru_cache(maxsize=128)
 def get_aspect_ratio_dimensions(aspect_ratio: str, base_size: int = 1280) -> Tuple[int, int]:
     """
     Get width and height for a given aspect ratio.
@@ -25,18 +83,10 @@ def get_aspect_ratio_dimensions(aspect_ratio: str, base_size: int = 1280) -> Tup
     Returns:
         Tuple of (width, height)
     """
-    ratios = {
-        "16:9": (16, 9),
-        "9:16": (9, 16),
-        "4:3": (4, 3),
-        "3:4": (3, 4),
-        "1:1": (1, 1),
-    }
-
-    if aspect_ratio not in ratios:
+    if aspect_ratio not in ASPECT_RATIOS:
         raise ValueError(f"Unsupported aspect ratio: {aspect_ratio}")
 
-    w_ratio, h_ratio = ratios[aspect_ratio]
+    w_ratio, h_ratio = ASPECT_RATIOS[aspect_ratio]
 
     # Calculate dimensions based on the aspect ratio
     if w_ratio >= h_ratio:
@@ -57,6 +107,10 @@ def fit_image_to_aspect_ratio(
     output_path: str = None,
     mode: Literal["pad", "crop"] = "pad",
     background_color: Tuple[int, int, int] = (0, 0, 0),
+    quality: Literal["fast", "high"] = "high",
+    max_size: Optional[int] = 1280,
+    save_quality: int = 95,
+    fast_save: bool = False,
 ) -> str:
     """
     Fit an image to a target aspect ratio using padding or cropping.
@@ -67,6 +121,10 @@ def fit_image_to_aspect_ratio(
         output_path: Path for output image (default: adds _fitted suffix)
         mode: "pad" to add letterboxing, "crop" to intelligently crop
         background_color: RGB color for padding (default: black)
+        quality: Resize quality, "fast" (bilinear) or "high" (Lanczos)
+        max_size: Longest side of the result in pixels; None keeps the source resolution
+        save_quality: JPEG quality of the output (default: 95)
+        fast_save: Trade some quality for a faster, smaller JPEG encode
 
     Returns:
         Path to processed image
@@ -76,53 +134,199 @@ def fit_image_to_aspect_ratio(
         ValueError: If aspect ratio is unsupported
     """
     input_file = Path(input_path)
-    if not input_file.exists():
-        raise FileNotFoundError(f"Input image not found: {input_path}")
 
     # Generate output path
     if output_path is None:
         output_path = str(input_file.parent / f"{input_file.stem}_fitted_{target_aspect_ratio.replace(':', 'x')}.jpg")
     output_file = Path(output_path)
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-
-    logger.info(f"Fitting image to {target_aspect_ratio} using {mode} mode...")
 
-    # Open image
-    with Image.open(input_file) as img:
-        # Convert to RGB if necessary
-        if img.mode != "RGB":
-            img = img.convert("RGB")
+    with _open_input_image(input_file) as img:
+        _ensure_dir(output_file.parent)
 
-        source_width, source_height = img.size
-        source_aspect = source_width / source_height
+        # Only the header has been read so far: an RGB JPEG that already has the
+        # right shape and size is copied as-is instead of decoded and re-encoded
+        if _fits_as_is(img, target_aspect_ratio, max_size):
+            if output_file.resolve() != input_file.resolve():
+                shutil.copyfile(input_file, output_file)
+            logger.info("Image already fits %s; copied to: %s", target_aspect_ratio, output_path)
+            return str(output_file)
 
-        # Calculate target dimensions
-        target_width, target_height = get_aspect_ratio_dimensions(
-            target_aspect_ratio, base_size=max(source_width, source_height)
+        result = fit_to_aspect_ratio(
+            img, target_aspect_ratio, mode=mode, background_color=background_color, quality=quality, max_size=max_size
         )
-        target_aspect = target_width / target_height
 
-        logger.debug(
-            f"Source: {source_width}x{source_height} (aspect: {source_aspect:.2f}), "
-            f"Target: {target_width}x{target_height} (aspect: {target_aspect:.2f})"
-        )
+    # Save the result
+    result.save(output_file, "JPEG", **_jpeg_save_options(save_quality, fast_save))
+    logger.info("Fitted image saved to: %s", output_path)
 
-        if mode == "pad":
-            # PAD MODE: Add letterboxing/pillarboxing to preserve entire image
-            result = pad_to_aspect_ratio(img, target_width, target_height, background_color)
+    return str(output_file)
 
-        elif mode == "crop":
-            # CROP MODE: Center crop to target aspect ratio
-            result = crop_to_aspect_ratio(img, target_aspect)
 
-        else:
-            raise ValueError(f"Invalid mode: {mode}. Use 'pad' or 'crop'")
+def _ensure_dir(directory: Path) -> None:
+    """
+    Create a directory (and parents) unless this process already did.
 
-        # Save the result
-        result.save(output_file, "JPEG", quality=95)
-        logger.info(f"Fitted image saved to: {output_path}")
+    Args:
+        directory: Directory to create
+    """
+    # Batches write many files into the same directory; only the first needs the mkdir
+    if directory not in _ENSURED_DIRS:
+        directory.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(directory)
 
-    return str(output_file)
+
+def _open_input_image(input_file: Path) -> Image.Image:
+    """
+    Open an input image, letting the open itself detect a missing file.
+
+    Args:
+        input_file: Path to input image
+
+    Returns:
+        Lazily opened PIL Image
+
+    Raises:
+        FileNotFoundError: If input image doesn't exist
+    """
+    # One filesystem lookup instead of an exists() check followed by the open
+    try:
+        return Image.open(input_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Input image not found: {input_file}") from None
+
+
+def _fits_as_is(img: Image.Image, target_aspect_ratio: str, max_size: Optional[int], tolerance: float = 0.01) -> bool:
+    """
+    Check whether an opened image can be used unchanged as a fitted JPEG.
+
+    Args:
+        img: Opened (not necessarily loaded) PIL Image
+        target_aspect_ratio: Target aspect ratio (e.g., "16:9", "9:16")
+        max_size: Longest allowed side in pixels, or None for no limit
+        tolerance: Allowed relative aspect-ratio difference
+
+    Returns:
+        True if the image is an upright RGB JPEG of the right aspect ratio and size
+    """
+    if img.format != "JPEG" or img.mode != "RGB" or target_aspect_ratio not in ASPECT_RATIOS:
+        return False
+    # Re-encoding drops the EXIF orientation, so a copy of a rotated photo would display differently
+    if img.getexif().get(EXIF_ORIENTATION_TAG, 1) != 1:
+        return False
+    if max_size is not None and max(img.size) > max_size:
+        return False
+
+    w_ratio, h_ratio = ASPECT_RATIOS[target_aspect_ratio]
+    target_aspect = w_ratio / h_ratio
+    return abs(img.width / img.height - target_aspect) / target_aspect < tolerance
+
+
+def fit_to_aspect_ratio(
+    img: Image.Image,
+    target_aspect_ratio: str,
+    mode: Literal["pad", "crop"] = "pad",
+    background_color: Tuple[int, int, int] = (0, 0, 0),
+    quality: Literal["fast", "high"] = "high",
+    max_size: Optional[int] = 1280,
+) -> Image.Image:
+    """
+    Fit an in-memory image to a target aspect ratio using padding or cropping.
+
+    Args:
+        img: PIL Image to fit
+        target_aspect_ratio: Target aspect ratio (e.g., "16:9", "9:16")
+        mode: "pad" to add letterboxing, "crop" to intelligently crop
+        background_color: RGB color for padding (default: black)
+        quality: Resize quality, "fast" (bilinear) or "high" (Lanczos)
+        max_size: Longest side of the result in pixels; None keeps the source resolution
+
+    Returns:
+        Fitted RGB PIL Image
+
+    Raises:
+        ValueError: If aspect ratio or mode is unsupported
+    """
+    logger.info("Fitting image to %s using %s mode...", target_aspect_ratio, mode)
+
+    # Let the JPEG decoder scale down while decoding (no-op for other formats or loaded images)
+    if max_size is not None and max(img.size) > max_size:
+        img.draft("RGB", (max_size, max_size))
+
+    # Convert to RGB if necessary
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    source_width, source_height = img.size
+    source_aspect = source_width / source_height
+
+    # Calculate target dimensions, capped so a huge photo doesn't get an equally huge canvas
+    base_size = max(source_width, source_height)
+    if max_size is not None:
+        base_size = min(base_size, max_size)
+    target_width, target_height = get_aspect_ratio_dimensions(target_aspect_ratio, base_size=base_size)
+    target_aspect = target_width / target_height
+
+    logger.debug(
+        "Source: %dx%d (aspect: %.2f), Target: %dx%d (aspect: %.2f)",
+        source_width,
+        source_height,
+        source_aspect,
+        target_width,
+        target_height,
+        target_aspect,
+    )
+
+    if mode == "pad":
+        # PAD MODE: Add letterboxing/pillarboxing to preserve entire image
+        return pad_to_aspect_ratio(img, target_width, target_height, background_color, quality=quality)
+
+    if mode == "crop":
+        # CROP MODE: Center crop to target aspect ratio
+        cropped = crop_to_aspect_ratio(img, target_aspect)
+        if max(cropped.size) > base_size:
+            cropped.thumbnail((base_size, base_size), RESAMPLING_FILTERS[quality])
+        return cropped
+
+    raise ValueError(f"Invalid mode: {mode}. Use 'pad' or 'crop'")
+
+
+def batch_fit_images(
+    input_paths: Sequence[str], target_aspect_ratio: str, max_workers: Optional[int] = None, **kwargs
+) -> List[str]:
+    """
+    Run fit_image_to_aspect_ratio() over many images in parallel processes.
+
+    Args:
+        input_paths: Paths to input images
+        target_aspect_ratio: Target aspect ratio (e.g., "16:9", "9:16")
+        max_workers: Worker processes (e.g. Config.max_workers; default: CPU count)
+        **kwargs: Further fit_image_to_aspect_ratio() options (mode, quality, ...)
+
+    Returns:
+        Paths to processed images, in input order
+    """
+    fit = partial(fit_image_to_aspect_ratio, target_aspect_ratio=target_aspect_ratio, **kwargs)
+    return _map_in_processes(fit, input_paths, max_workers)
+
+
+def _map_in_processes(func: Callable[[str], T], items: Sequence[str], max_workers: Optional[int]) -> List[T]:
+    """
+    Map a picklable function over items, using worker processes when worthwhile.
+
+    Args:
+        func: Module-level function (or partial of one) to apply
+        items: Inputs
+        max_workers: Worker processes (default: CPU count)
+
+    Returns:
+        Results in input order
+    """
+    if len(items) < 2 or max_workers == 1:
+        return [func(item) for item in items]
+
+    # Decoding and resampling hold the GIL between C calls, so processes scale better than threads
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
 
 
 def pad_to_aspect_ratio(
@@ -130,6 +334,7 @@ def pad_to_aspect_ratio(
     target_width: int,
     target_height: int,
     background_color: Tuple[int, int, int] = (0, 0, 0),
+    quality: Literal["fast", "high"] = "high",
 ) -> Image.Image:
     """
     Add padding to image to match target dimensions without cropping.
@@ -139,6 +344,7 @@ def pad_to_aspect_ratio(
         target_width: Target width
         target_height: Target height
         background_color: RGB color for padding
+        quality: Resize quality, "fast" (bilinear) or "high" (Lanczos)
 
     Returns:
         Padded PIL Image
@@ -159,17 +365,19 @@ def pad_to_aspect_ratio(
     new_height = int(source_height * scale)
 
     # Resize image
-    resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    resized = img.resize((new_width, new_height), RESAMPLING_FILTERS[quality])
 
-    # Create canvas with target dimensions
-    canvas = Image.new("RGB", (target_width, target_height), background_color)
+    # Create canvas with target dimensions. Pillow allocates new images zeroed
+    # (calloc), so a black canvas needs no explicit fill pass.
+    fill = None if tuple(background_color) == (0, 0, 0) else background_color
+    canvas = Image.new("RGB", (target_width, target_height), fill)
 
     # Center the resized image on canvas
     x_offset = (target_width - new_width) // 2
     y_offset = (target_height - new_height) // 2
     canvas.paste(resized, (x_offset, y_offset))
 
-    logger.debug(f"Padded {source_width}x{source_height} to {target_width}x{target_height}")
+    logger.debug("Padded %dx%d to %dx%d", source_width, source_height, target_width, target_height)
     return canvas
 
 
@@ -201,7 +409,7 @@ def crop_to_aspect_ratio(img: Image.Image, target_aspect: float) -> Image.Image:
         y_offset = (source_height - new_height) // 2
 
     cropped = img.crop((x_offset, y_offset, x_offset + new_width, y_offset + new_height))
-    logger.debug(f"Cropped from {source_width}x{source_height} to {new_width}x{new_height}")
+    logger.debug("Cropped from %dx%d to %dx%d", source_width, source_height, new_width, new_height)
     return cropped
 
 
@@ -209,6 +417,9 @@ def convert_to_black_and_white(
     input_path: str,
     output_path: str = None,
     method: Literal["grayscale", "high_contrast", "vintage"] = "high_contrast",
+    save_quality: int = 95,
+    fast_save: bool = False,
+    preserve_rgb: bool = False,
 ) -> str:
     """
     Convert image to black and white.
@@ -220,75 +431,286 @@ def convert_to_black_and_white(
             - "grayscale": Simple grayscale conversion
             - "high_contrast": Enhanced contrast B&W (recommended)
             - "vintage": Vintage photograph look with slight sepia tint then B&W
+        save_quality: JPEG quality of the output (default: 95)
+        fast_save: Trade some quality for a faster, smaller JPEG encode
+        preserve_rgb: Save a 3-channel JPEG instead of a grayscale one
 
     Returns:
         Path to black and white image
 
+    Raises:
+        FileNotFoundError: If input image doesn't exist
+    """
+    _, bw_path = convert_to_black_and_white_bytes(
+        input_path,
+        output_path=output_path,
+        method=method,
+        save_quality=save_quality,
+        fast_save=fast_save,
+        preserve_rgb=preserve_rgb,
+    )
+    return bw_path
+
+
+def convert_to_black_and_white_bytes(
+    input_path: str,
+    output_path: str = None,
+    method: Literal["grayscale", "high_contrast", "vintage"] = "high_contrast",
+    save_quality: int = 95,
+    fast_save: bool = False,
+    preserve_rgb: bool = False,
+) -> Tuple[bytes, str]:
+    """
+    Convert image to black and white, returning the encoded JPEG bytes.
+
+    The image is decoded and encoded once; the same bytes are written to
+    output_path so callers can hand them to APIs without re-reading the file.
+
+    Args:
+        input_path: Path to input image
+        output_path: Path for output image (default: adds _bw suffix)
+        method: Conversion method (grayscale, high_contrast, vintage)
+        save_quality: JPEG quality of the output (default: 95)
+        fast_save: Trade some quality for a faster, smaller JPEG encode
+        preserve_rgb: Save a 3-channel JPEG instead of a grayscale one
+
+    Returns:
+        Tuple of (JPEG bytes, path to black and white image)
+
     Raises:
         FileNotFoundError: If input image doesn't exist
     """
     input_file = Path(input_path)
-    if not input_file.exists():
-        raise FileNotFoundError(f"Input image not found: {input_path}")
 
     # Generate output path
     if output_path is None:
         output_path = str(input_file.parent / f"{input_file.stem}_bw.jpg")
     output_file = Path(output_path)
-    output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    logger.info(f"Converting to black and white using {method} method...")
+    with _open_input_image(input_file) as img:
+        logger.info("Converting to black and white using %s method...", method)
 
-    with Image.open(input_file) as img:
         # Convert to RGB if necessary
         if img.mode != "RGB":
             img = img.convert("RGB")
 
-        if method == "grayscale":
-            # Simple grayscale
-            bw_img = img.convert("L").convert("RGB")
+        # A grayscale JPEG carries the same picture in a third of the pixel data
+        bw_img = _apply_black_and_white(img, method)
+        if preserve_rgb:
+            bw_img = bw_img.convert("RGB")
+
+        # Encode once in memory, then persist the same bytes
+        buffer = io.BytesIO()
+        bw_img.save(buffer, "JPEG", **_jpeg_save_options(save_quality, fast_save))
+        image_bytes = buffer.getvalue()
 
-        elif method == "high_contrast":
-            # Enhanced contrast B&W (classic portrait style)
-            from PIL import ImageEnhance
+    _ensure_dir(output_file.parent)
+    output_file.write_bytes(image_bytes)
+    logger.info("Black and white image saved to: %s", output_path)
 
-            # Convert to grayscale
-            bw_img = img.convert("L")
+    return image_bytes, str(output_file)
 
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(bw_img)
-            bw_img = enhancer.enhance(1.3)  # Increase contrast by 30%
 
-            # Slight brightness adjustment
-            enhancer = ImageEnhance.Brightness(bw_img)
-            bw_img = enhancer.enhance(1.05)
+def _blend_level(degenerate: int, level: int, factor: float) -> int:
+    """
+    Compute one 8-bit level of an ImageEnhance-style blend.
 
-            # Convert back to RGB for compatibility
-            bw_img = bw_img.convert("RGB")
+    Mirrors Pillow's Image.blend() arithmetic (float32, truncated and clamped),
+    so lookup tables built from it match ImageEnhance output exactly.
 
-        elif method == "vintage":
-            # Vintage photograph look
-            from PIL import ImageEnhance
+    Args:
+        degenerate: Level of the degenerate image (mean for contrast, 0 for brightness)
+        level: Input level (0-255)
+        factor: Enhancement factor
 
-            # Convert to grayscale
-            bw_img = img.convert("L")
+    Returns:
+        Output level (0-255)
+    """
+    value = _float32(_float32(degenerate) + _float32(_float32(factor) * _float32(level - degenerate)))
+    if value <= 0.0:
+        return 0
+    if value >= 255.0:
+        return 255
+    return int(value)
 
-            # Add slight grain effect by reducing sharpness
-            enhancer = ImageEnhance.Sharpness(bw_img)
-            bw_img = enhancer.enhance(0.8)
 
-            # Adjust contrast for vintage look
-            enhancer = ImageEnhance.Contrast(bw_img)
-            bw_img = enhancer.enhance(1.2)
+def _float32(value: float) -> float:
+    """Round a Python float to single precision."""
+    return struct.unpack("f", struct.pack("f", value))[0]
 
-            # Convert to RGB
-            bw_img = bw_img.convert("RGB")
 
-        else:
-            raise ValueError(f"Unknown method: {method}")
+def batch_convert_to_black_and_white(
+    input_paths: Sequence[str],
+    method: Literal["grayscale", "high_contrast", "vintage"] = "high_contrast",
+    max_workers: Optional[int] = None,
+    **kwargs,
+) -> List[str]:
+    """
+    Run convert_to_black_and_white() over many images in parallel processes.
 
-        # Save result
-        bw_img.save(output_file, "JPEG", quality=95)
-        logger.info(f"Black and white image saved to: {output_path}")
+    Args:
+        input_paths: Paths to input images
+        method: Conversion method (grayscale, high_contrast, vintage)
+        max_workers: Worker processes (e.g. Config.max_workers; default: CPU count)
+        **kwargs: Further convert_to_black_and_white() options (save_quality, fast_save, ...)
 
-    return str(output_file)
+    Returns:
+        Paths to black and white images, in input order
+    """
+    convert = partial(convert_to_black_and_white, method=method, **kwargs)
+    return _map_in_processes(convert, input_paths, max_workers)
+
+
+def _apply_black_and_white(img: Image.Image, method: str) -> Image.Image:
+    """
+    Apply a black and white conversion method to an RGB image.
+
+    Args:
+        img: RGB PIL Image
+        method: Conversion method (grayscale, high_contrast, vintage)
+
+    Returns:
+        Black and white PIL Image in L (grayscale) mode
+
+    Raises:
+        ValueError: If method is unknown
+    """
+    if method == "grayscale":
+        # Simple grayscale
+        return img.convert("L")
+
+    elif method == "high_contrast":
+        # Enhanced contrast B&W (classic portrait style)
+        from PIL import ImageStat
+
+        # Convert to grayscale
+        bw_img = img.convert("L")
+
+        # Increase contrast by 30% around the mean level, then brighten slightly.
+        # Both are point operations, so they are fused into one lookup table.
+        mean = int(ImageStat.Stat(bw_img).mean[0] + 0.5)
+        lut = [_blend_level(0, _blend_level(mean, level, 1.3), 1.05) for level in range(256)]
+        return bw_img.point(lut)
+
+    elif method == "vintage":
+        # Vintage photograph look
+        from PIL import ImageEnhance, ImageStat
+
+        # Convert to grayscale
+        bw_img = img.convert("L")
+
+        # Add slight grain effect by reducing sharpness
+        enhancer = ImageEnhance.Sharpness(bw_img)
+        bw_img = enhancer.enhance(0.8)
+
+        # Adjust contrast for vintage look (as a lookup table, like high_contrast)
+        mean = int(ImageStat.Stat(bw_img).mean[0] + 0.5)
+        return bw_img.point([_blend_level(mean, level, 1.2) for level in range(256)])
+
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+
+def downscale_for_analysis(
+    image: Union[str, bytes],
+    max_edge: int = 1024,
+    min_size_bytes: int = 200 * 1024,
+    quality: int = 90,
+) -> Optional[bytes]:
+    """
+    Shrink an image for vision analysis, where detail beyond ~1024px is wasted.
+
+    Args:
+        image: Path to image file, or encoded image bytes
+        max_edge: Maximum length of the longest side in pixels (default: 1024)
+        min_size_bytes: Files smaller than this are left alone (default: 200KB)
+        quality: JPEG quality of the downscaled image (default: 90)
+
+    Returns:
+        JPEG bytes of the downscaled image, or None if the image is already small enough
+    """
+    size = len(image) if isinstance(image, bytes) else Path(image).stat().st_size
+    if size < min_size_bytes:
+        return None
+
+    with Image.open(io.BytesIO(image) if isinstance(image, bytes) else image) as img:
+        if max(img.size) <= max_edge:
+            return None
+
+        original_size = img.size
+        # Let the JPEG decoder scale down while decoding (no-op for other formats)
+        img.draft("RGB", (max_edge, max_edge))
+        # Re-encoding drops EXIF, so bake the orientation into the pixels
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=quality)
+
+    data = buffer.getvalue()
+    logger.debug("Downscaled image for analysis: %s -> %s (%d -> %d bytes)", original_size, img.size, size, len(data))
+    return data
+
+
+def is_heif(image_path: Union[str, Path]) -> bool:
+    """
+    Check whether a path refers to a HEIC/HEIF image.
+
+    Args:
+        image_path: Path to image file
+
+    Returns:
+        True if the file extension is .heic or .heif
+    """
+    return Path(image_path).suffix.lower() in HEIF_SUFFIXES
+
+
+def heif_to_jpeg(image_path: Union[str, Path], quality: int = 88, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Convert a HEIC/HEIF image to JPEG once, reusing the converted file afterwards.
+
+    The JPEG is cached under a name derived from the source path and mtime,
+    so later runs (and retries) skip the decode entirely.
+
+    Args:
+        image_path: Path to HEIC/HEIF image
+        quality: JPEG quality (default: 88)
+        cache_dir: Directory for converted files (default: ~/.cache/magical-photos/jpeg)
+
+    Returns:
+        Path to the JPEG version of the image
+
+    Raises:
+        RuntimeError: If pillow-heif is not installed
+    """
+    if not HEIF_SUPPORTED:
+        raise RuntimeError("HEIC/HEIF images require pillow-heif (pip install pillow-heif)")
+
+    source = Path(image_path).resolve()
+    fingerprint = f"{source}:{source.stat().st_mtime_ns}".encode()
+    cache_dir = cache_dir or HEIF_JPEG_CACHE_DIR
+    jpeg_path = cache_dir / f"{hashlib.blake2b(fingerprint, digest_size=16).hexdigest()}.jpg"
+    if jpeg_path.exists():
+        logger.debug("Reusing converted JPEG for %s", source.name)
+        return jpeg_path
+
+    _ensure_dir(cache_dir)
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        # Write to a temp file of our own first, so neither a crash nor another process
+        # converting the same photo can leave a truncated or interleaved cache entry
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                img.save(tmp_file, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp_name, jpeg_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    logger.info(f"Converted {source.name} to JPEG: {jpeg_path}")
+    return jpeg_path
@@ -5,24 +5,64 @@ Tracks API requests and enforces rate limits to prevent quota exhaustion.
 """
 
 import logging
+import math
+import mmap
+import os
+import struct
+import threading
 import time
-from collections import deque
-from datetime import datetime
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: state is shared, but updates are not serialized across processes
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
 
+def _release_state(state: mmap.mmap, fd: int):
+    """
+    Sync and release a limiter's state mapping and descriptor.
+
+    A module-level function so the finalizer holding it does not keep the limiter alive.
+
+    Args:
+        state: Mapping of the state file
+        fd: Descriptor of the state file
+    """
+    state.flush()
+    state.close()
+    os.close(fd)
+
+
 class RateLimiter:
     """
     Rate limiter that tracks API calls and enforces limits.
 
+    Implemented with GCRA (generic cell rate algorithm): a single theoretical
+    arrival time (TAT) advances by window / max_requests per request, and a
+    request is allowed while the TAT is less than one window ahead of now.
+    Every check is O(1) and the state file holds one number.
+
     Limits:
     - Maximum 10 API requests per minute per project
     - Maximum 4 videos returned per request
     """
 
+    # On-disk state: the TAT as one little-endian double
+    STATE_FORMAT = struct.Struct("<d")
+
+    # Seconds between msyncs of the state file. Other processes see updates through the
+    # shared mapping immediately; this only bounds what a crash of the machine can lose.
+    FLUSH_INTERVAL = 5.0
+
+    # Longest queue of reserved slots (seconds past the window) accepted as valid state
+    MAX_QUEUE_SECONDS = 24 * 60 * 60
+
     def __init__(
         self,
         max_requests_per_minute: int = 10,
@@ -41,99 +81,209 @@ class RateLimiter:
         self.window_seconds = window_seconds
         self.state_file = Path(state_file) if state_file else Path(".rate_limit_state")
 
-        # Track request timestamps in a sliding window
-        self.request_times = deque()
+        # Spacing between requests at the sustained rate
+        self.emission_interval = window_seconds / max_requests_per_minute
+
+        # Theoretical arrival time: when all recorded requests will have "drained"
+        self.tat = 0.0
+
+        # flock only excludes other processes, so threads sharing this instance also take a lock
+        self._thread_lock = threading.Lock()
+
+        # Open descriptor (used for locking) and shared mapping of the state file; None if unavailable
+        self._fd: Optional[int] = None
+        self._state: Optional[mmap.mmap] = None
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._finalizer: Optional[weakref.finalize] = None
+        self._open_state_file()
 
         # Load previous state if exists
         self._load_state()
 
         logger.info(f"RateLimiter initialized: {max_requests_per_minute} requests per {window_seconds}s")
 
-    def _load_state(self):
-        """Load previous request history from state file."""
-        if self.state_file.exists():
-            try:
-                with open(self.state_file, "r") as f:
-                    for line in f:
-                        timestamp = float(line.strip())
-                        # Only keep recent requests within the window
-                        if time.time() - timestamp < self.window_seconds:
-                            self.request_times.append(timestamp)
-                logger.debug(f"Loaded {len(self.request_times)} recent requests from state file")
-            except Exception as e:
-                logger.warning(f"Failed to load rate limit state: {e}")
+    def _open_state_file(self):
+        """
+        Open and memory-map the state file, creating it at the right size if needed.
+
+        Every process using the same path maps the same page, so state is
+        shared through plain memory reads and writes instead of file I/O.
+        On failure, state is kept in memory only.
+        """
+        size = self.STATE_FORMAT.size
+        try:
+            fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Failed to open rate limit state file, state will not be shared: {e}")
+            return
 
-    def _save_state(self):
-        """Save current request history to state file."""
         try:
-            with open(self.state_file, "w") as f:
-                for timestamp in self.request_times:
-                    f.write(f"{timestamp}\n")
-        except Exception as e:
-            logger.warning(f"Failed to save rate limit state: {e}")
+            with self._locked(fd):
+                if os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, size)
+                self._state = mmap.mmap(fd, size)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to map rate limit state file, state will not be shared: {e}")
+            os.close(fd)
+            return
+        self._fd = fd
+
+        # Write back and release the file when the limiter is collected or, at the latest, at interpreter exit
+        self._finalizer = weakref.finalize(self, _release_state, self._state, fd)
+
+    @staticmethod
+    @contextmanager
+    def _locked(fd: Optional[int]) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the state file, serializing all processes sharing it.
 
-    def _cleanup_old_requests(self):
-        """Remove requests outside the current time window."""
-        current_time = time.time()
-        cutoff_time = current_time - self.window_seconds
+        Args:
+            fd: Descriptor of the state file (None: no locking)
+        """
+        if fd is None or fcntl is None:
+            yield
+            return
+
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
 
-        # Remove old requests from the left of the deque
-        while self.request_times and self.request_times[0] < cutoff_time:
-            self.request_times.popleft()
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the state exclusively against other threads and other processes."""
+        with self._thread_lock, self._locked(self._fd):
+            yield
 
-    def get_current_count(self) -> int:
+    def _load_state(self, now: Optional[float] = None):
         """
-        Get number of requests in current time window.
+        Load the theoretical arrival time from the state file.
 
-        Returns:
-            Number of requests in the current window
+        The state file is shared by every process using the same path, so
+        reloading it replaces the in-memory TAT with the combined view.
+
+        Args:
+            now: Current timestamp, if the caller already read the clock
         """
-        self._cleanup_old_requests()
-        return len(self.request_times)
+        if self._state is None:
+            return
+
+        (tat,) = self.STATE_FORMAT.unpack_from(self._state, 0)
+        # A valid TAT is at most one window plus the reserved queue ahead; anything else is a corrupt
+        # or old-format file
+        limit = (time.time() if now is None else now) + self.window_seconds + self.MAX_QUEUE_SECONDS
+        if not 0.0 <= tat <= limit:
+            logger.warning(f"Ignoring invalid rate limit state: {tat!r}")
+            tat = 0.0
+        self.tat = tat
 
-    def get_time_until_available(self) -> float:
+    def _save_state(self):
+        """Save the theoretical arrival time to the state file, syncing it to disk at most every FLUSH_INTERVAL."""
+        if self._state is None:
+            return
+
+        self.STATE_FORMAT.pack_into(self._state, 0, self.tat)
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        """Sync pending state to disk."""
+        self._state.flush()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush the state file to disk and release the mapping."""
+        with self._thread_lock:
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+            self._state = None
+            self._fd = None
+            self._dirty = False
+
+    def _record_locked(self, current_time: float) -> float:
         """
-        Get seconds until a request slot becomes available.
+        Record a request at current_time, claiming the next free slot. The caller holds the state file lock.
+
+        Args:
+            current_time: Timestamp of the request
 
         Returns:
-            Seconds to wait (0 if slot is available now)
+            Seconds until the claimed slot opens (0.0 if it is free now); the slot
+            belongs to the caller once that time has passed
         """
-        self._cleanup_old_requests()
+        # Pick up requests recorded by other processes before deciding
+        self._load_state(current_time)
+        tat = max(current_time, self.tat) + self.emission_interval
+        self.tat = tat
+        self._save_state()
+
+        # A request is allowed once the TAT it produces is at most one window ahead
+        return max(0.0, tat - self.window_seconds - current_time)
 
-        if len(self.request_times) < self.max_requests:
-            return 0.0
+    def _count_at(self, now: float) -> int:
+        """Requests in the window at now, from the TAT last loaded."""
+        return max(0, math.ceil((self.tat - now) / self.emission_interval))
 
-        # Calculate when the oldest request will expire
-        oldest_request = self.request_times[0]
-        time_until_expire = (oldest_request + self.window_seconds) - time.time()
+    def _wait_at(self, now: float) -> float:
+        """Seconds from now until a slot is free, from the TAT last loaded."""
+        # A request is allowed once the TAT it would produce is at most one window ahead
+        return max(0.0, self.tat + self.emission_interval - self.window_seconds - now)
 
-        return max(0.0, time_until_expire)
+    def _reload(self, now: float):
+        """Pick up requests recorded by other processes sharing the state file."""
+        with self._exclusive():
+            self._load_state(now)
 
-    def can_make_request(self) -> bool:
+    def get_current_count(self, now: Optional[float] = None) -> int:
         """
-        Check if a request can be made now.
+        Get number of requests in current time window.
+
+        Args:
+            now: Current timestamp, if the caller already read the clock
 
         Returns:
-            True if request can be made without exceeding limits
+            Number of requests in the current window (derived from the TAT)
         """
-        return self.get_time_until_available() == 0.0
+        if now is None:
+            now = time.time()
+        self._reload(now)
+        return self._count_at(now)
 
-    def wait_if_needed(self, operation_name: str = "API call"):
+    def get_time_until_available(self, now: Optional[float] = None) -> float:
         """
-        Wait if necessary to respect rate limits.
+        Get seconds until a request slot becomes available.
 
         Args:
-            operation_name: Name of the operation for logging
+            now: Current timestamp, if the caller already read the clock
+
+        Returns:
+            Seconds to wait (0 if slot is available now)
         """
-        wait_time = self.get_time_until_available()
+        if now is None:
+            now = time.time()
+        self._reload(now)
+        return self._wait_at(now)
 
-        if wait_time > 0:
-            current_count = self.get_current_count()
-            logger.info(
-                f"Rate limit: {current_count}/{self.max_requests} requests used. "
-                f"Waiting {wait_time:.1f}s before {operation_name}..."
-            )
-            time.sleep(wait_time + 0.1)  # Add small buffer
+    def can_make_request(self, now: Optional[float] = None) -> bool:
+        """
+        Check if a request can be made now.
+
+        Args:
+            now: Current timestamp, if the caller already read the clock
+
+        Returns:
+            True if request can be made without exceeding limits
+        """
+        if now is None:
+            now = time.time()
+        self._reload(now)
+        # Same test as _wait_at() == 0, without the extra call and max()
+        return self.tat + self.emission_interval - self.window_seconds <= now
 
     def record_request(self, operation_name: str = "API call"):
         """
@@ -142,15 +292,26 @@ class RateLimiter:
         Args:
             operation_name: Name of the operation for logging
         """
-        self.wait_if_needed(operation_name)
+        # Claim the next slot under the lock, even if it is in the future. Each
+        # caller (in any thread or process) then owns a distinct slot and sleeps
+        # exactly until it opens: callers proceed in arrival order, one per slot.
+        now = time.time()
+        with self._exclusive():
+            wait_time = self._record_locked(now)
 
-        current_time = time.time()
-        self.request_times.append(current_time)
-        self._save_state()
+        if wait_time > 0:
+            # Reserved slots are one emission interval apart, so the delay says how many are ahead of ours
+            queued_ahead = max(0, math.ceil(wait_time / self.emission_interval - 1e-9) - 1)
+            logger.info(
+                f"Rate limit: {self.max_requests} requests per {self.window_seconds}s reached, "
+                f"{queued_ahead} queued ahead. Waiting {wait_time:.1f}s before {operation_name}..."
+            )
+            time.sleep(wait_time)
+            now += wait_time
 
-        current_count = self.get_current_count()
         logger.debug(
-            f"Request recorded for '{operation_name}': " f"{current_count}/{self.max_requests} in current window"
+            f"Request recorded for '{operation_name}': "
+            f"{self._count_at(now)}/{self.max_requests} in current window"
         )
 
     def get_status(self) -> dict:
@@ -160,21 +321,29 @@ class RateLimiter:
         Returns:
             Dictionary with status information
         """
-        self._cleanup_old_requests()
+        # One clock read so the reported fields are consistent with each other
+        now = time.time()
+        self._reload(now)
+        # Reserved future slots (see record_request) count past max_requests; report them separately
+        count = self._count_at(now)
+        current_count = min(count, self.max_requests)
+        wait_time = self._wait_at(now)
 
         return {
-            "current_requests": len(self.request_times),
+            "current_requests": current_count,
+            "queued_requests": count - current_count,
             "max_requests": self.max_requests,
             "window_seconds": self.window_seconds,
-            "requests_available": self.max_requests - len(self.request_times),
-            "wait_time_seconds": self.get_time_until_available(),
-            "can_make_request": self.can_make_request(),
+            "requests_available": self.max_requests - current_count,
+            "wait_time_seconds": wait_time,
+            "can_make_request": wait_time == 0.0,
         }
 
     def reset(self):
         """Clear all request history."""
-        self.request_times.clear()
-        self._save_state()
+        with self._exclusive():
+            self.tat = 0.0
+            self._save_state()
         logger.info("Rate limiter reset")
 
 
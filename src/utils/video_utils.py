@@ -5,19 +5,265 @@ This module provides utilities for creating looping videos,
 crossfading, and other video enhancements.
 """
 
+import ctypes
+import functools
 import logging
+import struct
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import Optional
+from string import Template
+from typing import BinaryIO, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Hardware H.264 encoders for the crossfade path, in order of preference
+HW_ENCODERS = ("h264_videotoolbox", "h264_nvenc", "h264_qsv")
+
+# Software fallback settings for the crossfade path
+DEFAULT_PRESET = "veryfast"
+DEFAULT_CRF = 18
+
+# Crossfade loop: the last $crossfade seconds fade into the first ones.
+# Placeholders: $fade_start, $duration, $crossfade
+LOOP_FILTER_TEMPLATE = Template(
+    "[0:v]split[v1][v2];"
+    "[v1]trim=0:$fade_start,setpts=PTS-STARTPTS[main];"
+    "[v2]trim=$fade_start:$duration,setpts=PTS-STARTPTS[fade_out];"
+    "[0:v]trim=0:$crossfade,setpts=PTS-STARTPTS[fade_in];"
+    "[fade_out][fade_in]xfade=transition=fade:duration=$crossfade:offset=0[xf];"
+    "[main][xf]concat=n=2:v=1:a=0"
+)
+
+# Hardware encoders whose encode failed in this process; later loops go straight to the next choice
+_failed_hw_encoders: Set[str] = set()
+
+# Bytes of ffmpeg's log kept for error messages; the rest is discarded as it streams
+FFMPEG_LOG_TAIL_BYTES = 16384
+
+# MP4/MOV container boxes leading from the top level to the movie header
+_MP4_CONTAINER_BOX = b"moov"
+_MP4_HEADER_BOX = b"mvhd"
+
+
+@functools.lru_cache(maxsize=1)
+def _cuda_available() -> bool:
+    """
+    Check whether an NVIDIA driver is present without importing torch.
+
+    Returns:
+        True if libcuda can be loaded
+    """
+    try:
+        ctypes.CDLL("libcuda.so.1")
+        return True
+    except OSError:
+        return False
+
+
+def _run_ffmpeg(cmd: list) -> None:
+    """
+    Run an ffmpeg command, keeping only the tail of its log.
+
+    Args:
+        cmd: Command line to run
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails (stderr holds the raw log tail, not necessarily UTF-8)
+    """
+    logger.debug(f"Running ffmpeg command: {' '.join(cmd)}")
+    tail = bytearray()
+    truncated = False
+    with subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as process:
+        # stderr is the only pipe, so reading it to EOF cannot deadlock
+        for chunk in iter(lambda: process.stderr.read(4096), b""):
+            tail += chunk
+            if len(tail) > FFMPEG_LOG_TAIL_BYTES:
+                del tail[:-FFMPEG_LOG_TAIL_BYTES]
+                truncated = True
+        returncode = process.wait()
+
+    if returncode:
+        if truncated:
+            # Start at a line boundary rather than partway through a message
+            del tail[: tail.find(b"\n") + 1]
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=bytes(tail))
+
+
+def _concat_copies(input_file: Path, output_file: Path, copies: int) -> None:
+    """
+    Write a video repeated back to back, copying its streams without re-encoding.
+
+    Args:
+        input_file: Video to repeat
+        output_file: Destination video
+        copies: Number of times the video plays
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    # The concat demuxer reads a list of files; quote the path for its parser
+    quoted = str(input_file.resolve()).replace("'", "'\\''")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as concat_list:
+        concat_list.write(f"file '{quoted}'\n" * copies)
+    try:
+        _run_ffmpeg(
+            ["ffmpeg", "-f", "concat", "-safe", "0", "-i", concat_list.name, "-c", "copy", "-y", str(output_file)]
+        )
+    finally:
+        Path(concat_list.name).unlink()
+
+
+@functools.lru_cache(maxsize=1)
+def _listed_hw_encoders() -> Tuple[str, ...]:
+    """
+    Find the hardware H.264 encoders this machine's ffmpeg was built with.
+
+    Returns:
+        Encoder names from HW_ENCODERS, in order of preference
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+    except OSError:
+        return ()
+    available = {fields[1] for fields in (line.split() for line in result.stdout.splitlines()) if len(fields) > 1}
+
+    # Builds commonly include NVENC without an NVIDIA GPU being present
+    return tuple(
+        encoder
+        for encoder in HW_ENCODERS
+        if encoder in available and (encoder != "h264_nvenc" or _cuda_available())
+    )
+
+
+def _hw_encoder() -> Optional[str]:
+    """
+    Pick the preferred hardware H.264 encoder that has not failed in this process.
+
+    Being listed by ffmpeg does not mean an encoder works (QSV is built into most
+    Linux builds, Intel GPU or not), so encoders that fail are skipped afterwards.
+
+    Returns:
+        Encoder name from HW_ENCODERS, or None to encode with libx264
+    """
+    for encoder in _listed_hw_encoders():
+        if encoder not in _failed_hw_encoders:
+            return encoder
+    return None
+
+
+def _encoder_args(encoder: Optional[str], preset: str, crf: int) -> Tuple[List[str], List[str]]:
+    """
+    Build ffmpeg input and output arguments for an H.264 encoder.
+
+    Args:
+        encoder: Hardware encoder name, or None for libx264
+        preset: libx264/QSV speed preset
+        crf: Constant quality level (lower is better); mapped onto VideoToolbox's 1-100 scale
+
+    Returns:
+        Tuple of (input arguments, output arguments)
+    """
+    if encoder == "h264_nvenc":
+        return ["-hwaccel", "cuda"], ["-c:v", encoder, "-preset", "p4", "-tune", "hq", "-rc", "vbr", "-cq", str(crf)]
+    if encoder == "h264_qsv":
+        return [], ["-c:v", encoder, "-preset", preset, "-global_quality", str(crf)]
+    if encoder == "h264_videotoolbox":
+        # VideoToolbox quality runs the other way, 100 being best; CRF 18 maps to 65
+        quality = max(1, min(100, round(100 - crf * 100 / 51)))
+        return [], ["-c:v", encoder, "-q:v", str(quality)]
+    return [], ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+
+
+def _read_mp4_duration(stream: BinaryIO) -> Optional[float]:
+    """
+    Read the duration from an MP4/MOV movie header without decoding anything.
+
+    Args:
+        stream: Binary file positioned at the start of the container
+
+    Returns:
+        Duration in seconds, or None if no movie header was found
+    """
+    end = None
+    while True:
+        header = stream.read(8)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", stream.read(8))
+            header_size = 16
+        elif size == 0 and end is None:
+            size = None
+
+        if box_type == _MP4_CONTAINER_BOX:
+            # Descend into moov: its children follow directly
+            end = None if size is None else stream.tell() - header_size + size
+            continue
+        if box_type == _MP4_HEADER_BOX:
+            version = stream.read(4)[0]
+            if version == 1:
+                timescale, duration = struct.unpack(">16xIQ", stream.read(28))
+            else:
+                timescale, duration = struct.unpack(">8xII", stream.read(16))
+            return duration / timescale if timescale else None
+
+        if size is None or size < header_size:
+            return None
+        stream.seek(size - header_size, 1)
+        if end is not None and stream.tell() >= end:
+            return None
+
+
+def get_video_duration(input_path: str) -> float:
+    """
+    Get a video's duration in seconds.
+
+    MP4/MOV headers are parsed directly, which avoids starting an ffprobe
+    process; other containers fall back to ffprobe.
+
+    Args:
+        input_path: Path to video
+
+    Returns:
+        Duration in seconds
+
+    Raises:
+        subprocess.CalledProcessError: If the ffprobe fallback fails
+    """
+    try:
+        with open(input_path, "rb") as f:
+            duration = _read_mp4_duration(f)
+        if duration:
+            return duration
+    except (OSError, struct.error, IndexError) as e:
+        logger.debug(f"Could not read MP4 header of {input_path}: {e}")
+
+    duration_cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        str(input_path),
+    ]
+    result = subprocess.run(duration_cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
 
 def create_looping_video(
     input_path: str,
     output_path: Optional[str] = None,
     crossfade_duration: float = 0.5,
     num_loops: int = 1,
+    preset: str = DEFAULT_PRESET,
+    crf: int = DEFAULT_CRF,
 ) -> str:
     """
     Create a seamlessly looping video using crossfade.
@@ -25,8 +271,13 @@ def create_looping_video(
     Args:
         input_path: Path to input video
         output_path: Path for output video (default: adds _loop suffix)
-        crossfade_duration: Duration of crossfade in seconds (default: 0.5)
-        num_loops: Number of times to loop (default: 1, meaning 2 total plays)
+        crossfade_duration: Duration of crossfade in seconds (default: 0.5); 0 repeats the
+            video without re-encoding
+        num_loops: Number of times the video plays back to back in the output (default: 1, a
+            single play whose end crossfades into its start; without a crossfade that is an
+            unchanged remux of the input)
+        preset: libx264 speed preset when no hardware encoder is available (default: veryfast)
+        crf: Constant quality level; lower is better (default: 18)
 
     Returns:
         Path to looping video
@@ -48,65 +299,70 @@ def create_looping_video(
     logger.info(f"Creating looping video with {crossfade_duration}s crossfade...")
 
     try:
+        # Without a crossfade nothing has to be re-encoded
+        if crossfade_duration <= 0:
+            _concat_copies(input_file, output_file, max(1, num_loops))
+            logger.info(f"Looping video created: {output_path}")
+            return str(output_file)
+
         # Get video duration
-        duration_cmd = [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(input_file),
-        ]
-        result = subprocess.run(duration_cmd, capture_output=True, text=True, check=True)
-        duration = float(result.stdout.strip())
+        duration = get_video_duration(str(input_file))
         logger.debug(f"Video duration: {duration}s")
 
-        # Calculate crossfade timing
-        fade_start = duration - crossfade_duration
-
         # Build the loop with crossfade
         # For a seamless loop, we overlap the end with the beginning using crossfade
-        filter_complex = (
-            f"[0:v]split[v1][v2];"
-            f"[v1]trim=0:{fade_start},setpts=PTS-STARTPTS[main];"
-            f"[v2]trim={fade_start}:{duration},setpts=PTS-STARTPTS[fade_out];"
-            f"[0:v]trim=0:{crossfade_duration},setpts=PTS-STARTPTS[fade_in];"
-            f"[fade_out][fade_in]xfade=transition=fade:duration={crossfade_duration}:offset=0[xf];"
-            f"[main][xf]concat=n=2:v=1:a=0"
+        filter_complex = LOOP_FILTER_TEMPLATE.substitute(
+            fade_start=duration - crossfade_duration, duration=duration, crossfade=crossfade_duration
         )
 
-        # If multiple loops requested, repeat the pattern
+        # Several plays are encoded once and then repeated without re-encoding
+        encode_file = output_file
         if num_loops > 1:
-            filter_complex += f"[base];[base]loop={num_loops}:1:0"
-
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-i",
-            str(input_file),
-            "-filter_complex",
-            filter_complex,
-            "-c:v",
-            "libx264",
-            "-preset",
-            "medium",
-            "-crf",
-            "18",
-            "-pix_fmt",
-            "yuv420p",
-            "-y",
-            str(output_file),
-        ]
-
-        logger.debug(f"Running ffmpeg command: {' '.join(ffmpeg_cmd)}")
-        subprocess.run(ffmpeg_cmd, capture_output=True, check=True)
+            encode_file = output_file.with_name(f"{output_file.stem}.once{output_file.suffix}")
+
+        def build_cmd(encoder: Optional[str]) -> list:
+            input_args, encoder_args = _encoder_args(encoder, preset, crf)
+            return [
+                "ffmpeg",
+                *input_args,
+                "-i",
+                str(input_file),
+                "-filter_complex",
+                filter_complex,
+                *encoder_args,
+                "-pix_fmt",
+                "yuv420p",
+                "-y",
+                str(encode_file),
+            ]
+
+        # Prefer a hardware encoder when ffmpeg has one, falling back to libx264
+        encoded = False
+        hw_encoder = _hw_encoder()
+        while hw_encoder and not encoded:
+            try:
+                _run_ffmpeg(build_cmd(hw_encoder))
+                encoded = True
+            except subprocess.CalledProcessError as e:
+                error_msg = e.stderr.decode(errors="replace") if e.stderr else str(e)
+                logger.warning(f"{hw_encoder} encode failed, not using it again: {error_msg[-200:]}")
+                _failed_hw_encoders.add(hw_encoder)
+                hw_encoder = _hw_encoder()
+
+        if not encoded:
+            _run_ffmpeg(build_cmd(None))
+
+        if encode_file != output_file:
+            try:
+                _concat_copies(encode_file, output_file, num_loops)
+            finally:
+                encode_file.unlink(missing_ok=True)
 
         logger.info(f"Looping video created: {output_path}")
         return str(output_file)
 
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
+        error_msg = e.stderr.decode(errors="replace") if e.stderr else str(e)
         logger.error(f"FFmpeg error: {error_msg}")
         raise RuntimeError(f"Failed to create looping video: {error_msg}") from e
     except Exception as e:
@@ -155,14 +411,13 @@ def create_simple_loop(input_path: str, output_path: Optional[str] = None, num_l
             str(output_file),
         ]
 
-        logger.debug(f"Running ffmpeg command: {' '.join(ffmpeg_cmd)}")
-        subprocess.run(ffmpeg_cmd, capture_output=True, check=True)
+        _run_ffmpeg(ffmpeg_cmd)
 
         logger.info(f"Looped video created: {output_path}")
         return str(output_file)
 
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
+        error_msg = e.stderr.decode(errors="replace") if e.stderr else str(e)
         logger.error(f"FFmpeg error: {error_msg}")
         raise RuntimeError(f"Failed to create looped video: {error_msg}") from e
 
@@ -199,15 +454,18 @@ def convert_video_to_bw(
 
     logger.info(f"Converting video to B&W ({method} method)...")
 
-    # Build filter based on method
+    # Build filter based on method. format=gray keeps only the luma plane,
+    # so later filters touch a third of the data that hue=s=0 would keep.
     if method == "grayscale":
-        vf_filter = "hue=s=0"
+        vf_filter = "format=gray"
     elif method == "high_contrast":
-        vf_filter = "hue=s=0,eq=contrast=1.2:brightness=0.05"
+        vf_filter = "format=gray,eq=contrast=1.2:brightness=0.05"
     elif method == "vintage":
-        vf_filter = "hue=s=0,curves=vintage,eq=contrast=1.1"
+        # curves only runs on RGB, so ffmpeg converts back for it and the preset's
+        # per-channel curves tint the frames; the second format=gray drops the tint
+        vf_filter = "format=gray,curves=vintage,format=gray,eq=contrast=1.1"
     else:
-        vf_filter = "hue=s=0"
+        vf_filter = "format=gray"
 
     try:
         ffmpeg_cmd = [
@@ -230,13 +488,12 @@ def convert_video_to_bw(
             str(output_file),
         ]
 
-        logger.debug(f"Running ffmpeg command: {' '.join(ffmpeg_cmd)}")
-        subprocess.run(ffmpeg_cmd, capture_output=True, check=True)
+        _run_ffmpeg(ffmpeg_cmd)
 
         logger.info(f"B&W video created: {output_path}")
         return str(output_file)
 
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
+        error_msg = e.stderr.decode(errors="replace") if e.stderr else str(e)
         logger.error(f"FFmpeg error: {error_msg}")
         raise RuntimeError(f"Failed to convert video to B&W: {error_msg}") from e
@@ -2,13 +2,36 @@
 Video Generator using Veo 3.1 for Harry Potter style animations.
 """
 
+import asyncio
+import functools
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=4)
+def _get_veo_client(api_key: str, model_name: str):
+    """
+    Get the process-wide Veo3Client for an API key and model.
+
+    Generators created per image then share one client and its HTTP session.
+
+    Args:
+        api_key: Google API key
+        model_name: Veo model name
+
+    Returns:
+        Shared Veo3Client instance
+    """
+    from src.api.veo3_client import Veo3Client
+
+    logger.info("Initializing Veo 3.1 client...")
+    return Veo3Client(api_key=api_key, model_name=model_name)
+
+
 class VideoGenerator:
     """Video generator using Veo 3.1."""
 
@@ -16,6 +39,7 @@ class VideoGenerator:
         self,
         google_api_key: str,
         veo_model_name: str = "veo-3.1-generate-preview",
+        genai_client=None,
     ):
         """
         Initialize video generator.
@@ -23,9 +47,11 @@ class VideoGenerator:
         Args:
             google_api_key: Google API key (required for Veo)
             veo_model_name: Veo model name
+            genai_client: Optional existing genai.Client for Veo to share
         """
         self.google_api_key = google_api_key
         self.veo_model_name = veo_model_name
+        self.genai_client = genai_client
         self.veo_client = None
 
         logger.info(f"VideoGenerator initialized with model: {veo_model_name}")
@@ -33,10 +59,16 @@ class VideoGenerator:
     def _init_veo(self):
         """Initialize Veo 3.1 client (lazy loading)."""
         if self.veo_client is None:
+            if self.genai_client is None:
+                self.veo_client = _get_veo_client(self.google_api_key, self.veo_model_name)
+                return
+
             from src.api.veo3_client import Veo3Client
 
             logger.info("Initializing Veo 3.1 client...")
-            self.veo_client = Veo3Client(api_key=self.google_api_key, model_name=self.veo_model_name)
+            self.veo_client = Veo3Client(
+                api_key=self.google_api_key, model_name=self.veo_model_name, genai_client=self.genai_client
+            )
 
     def generate_video(
         self,
@@ -70,6 +102,79 @@ class VideoGenerator:
             image_path=image_path, prompt=prompt, output_path=output_path, timeout=kwargs.get("timeout", 300)
         )
 
+    async def generate_video_async(
+        self,
+        image_path: str,
+        prompt: str,
+        output_path: Optional[str] = None,
+        duration: int = 8,
+        **kwargs,
+    ) -> str:
+        """
+        Generate video from image without blocking the event loop.
+
+        The blocking Veo call (request, polling, download) runs in a worker
+        thread; the shared rate limiter still spaces out generation requests.
+
+        Args:
+            image_path: Path to input image
+            prompt: Animation description prompt
+            output_path: Optional output path
+            duration: Desired video duration in seconds
+            **kwargs: Additional parameters
+
+        Returns:
+            Path to generated video
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.generate_video, image_path, prompt, output_path, duration, **kwargs)
+        )
+
+    async def generate_videos_async(
+        self, jobs: Sequence[Tuple[str, str]], max_concurrent: Optional[int] = None, **kwargs
+    ) -> List[Union[str, BaseException]]:
+        """
+        Generate several videos concurrently.
+
+        Generation is dominated by server-side rendering and polling, so
+        overlapping jobs uses the request quota instead of waiting on each
+        video in turn.
+
+        Args:
+            jobs: (image_path, prompt) pairs
+            max_concurrent: Jobs in flight at once (default: the rate limit's requests per window)
+            **kwargs: Additional generate_video() parameters
+
+        Returns:
+            Video path or raised exception for each job, in input order
+
+        Raises:
+            ValueError: If output_path is given, since every job would write to it
+        """
+        if "output_path" in kwargs:
+            raise ValueError("output_path names a single file; batch jobs get their own output paths")
+
+        if max_concurrent is None:
+            from src.utils.rate_limiter import get_rate_limiter
+
+            max_concurrent = get_rate_limiter().max_requests
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        # Jobs start within the same second, so the client's timestamped default names would collide;
+        # the job index keeps each output (even of the same image twice) distinct
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        async def bounded(index: int, image_path: str, prompt: str) -> str:
+            output_path = str(Path("output") / f"{Path(image_path).stem}_animated_{timestamp}_{index}.mp4")
+            async with semaphore:
+                return await self.generate_video_async(image_path, prompt, output_path, **kwargs)
+
+        return await asyncio.gather(
+            *(bounded(index, image_path, prompt) for index, (image_path, prompt) in enumerate(jobs)),
+            return_exceptions=True,
+        )
+
     def get_backend_info(self) -> dict:
         """
         Get information about Veo backend.
@@ -6,8 +6,6 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from google import genai
-
 from src.utils.config import Config, setup_logging
 
 
@@ -16,6 +14,9 @@ def main():
     config = Config.from_env()
     setup_logging(config)
 
+    # Imported here so a missing key fails fast, before the SDK import
+    from google import genai
+
     client = genai.Client(api_key=config.google_api_key)
 
     print("Testing API access...\n")
@@ -0,0 +1,60 @@
+"""Tests for the black and white conversion lookup tables."""
+
+import random
+
+import pytest
+from PIL import Image, ImageEnhance
+
+from src.utils.image_utils import _apply_black_and_white
+
+
+def _noise_image(seed: int) -> Image.Image:
+    """Build a noisy RGB image covering the full level range."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (64, 48))
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(64 * 48)])
+    return img
+
+
+def _reference_high_contrast(img: Image.Image) -> Image.Image:
+    bw_img = img.convert("L")
+    bw_img = ImageEnhance.Contrast(bw_img).enhance(1.3)
+    return ImageEnhance.Brightness(bw_img).enhance(1.05)
+
+
+def _reference_vintage(img: Image.Image) -> Image.Image:
+    bw_img = img.convert("L")
+    bw_img = ImageEnhance.Sharpness(bw_img).enhance(0.8)
+    return ImageEnhance.Contrast(bw_img).enhance(1.2)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_high_contrast_matches_image_enhance(seed):
+    img = _noise_image(seed)
+
+    result = _apply_black_and_white(img, "high_contrast")
+
+    assert result.mode == "L"
+    assert result.tobytes() == _reference_high_contrast(img).tobytes()
+
+
+@pytest.mark.parametrize("level", [0, 40, 128, 220, 255])
+def test_high_contrast_matches_image_enhance_on_flat_images(level):
+    img = Image.new("RGB", (8, 8), (level, level, level))
+
+    assert _apply_black_and_white(img, "high_contrast").tobytes() == _reference_high_contrast(img).tobytes()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vintage_matches_image_enhance(seed):
+    img = _noise_image(seed)
+
+    result = _apply_black_and_white(img, "vintage")
+
+    assert result.mode == "L"
+    assert result.tobytes() == _reference_vintage(img).tobytes()
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        _apply_black_and_white(Image.new("RGB", (4, 4)), "sepia")
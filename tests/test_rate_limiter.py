@@ -0,0 +1,139 @@
+"""Tests for the GCRA rate limiter."""
+
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Stand-in for the time module: sleeping advances the clock instantly."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    """Limiter allowing 4 requests per 60s, with its state file under tmp_path."""
+    instance = RateLimiter(max_requests_per_minute=4, window_seconds=60, state_file=str(tmp_path / "state"))
+    yield instance
+    instance.close()
+
+
+def test_allows_burst_of_max_requests(limiter, clock):
+    for _ in range(4):
+        limiter.record_request()
+
+    assert clock.sleeps == []
+    status = limiter.get_status()
+    assert status["current_requests"] == 4
+    assert status["requests_available"] == 0
+    assert not status["can_make_request"]
+
+
+def test_spaces_requests_after_burst(limiter, clock):
+    for _ in range(6):
+        limiter.record_request()
+
+    # Slots free up one emission interval (60s / 4) apart
+    assert clock.sleeps == pytest.approx([15.0, 15.0])
+
+
+def test_status_reports_wait_until_next_slot(limiter, clock):
+    for _ in range(4):
+        limiter.record_request()
+
+    clock.now += 10.0
+    status = limiter.get_status()
+    assert status["wait_time_seconds"] == pytest.approx(5.0)
+    assert not status["can_make_request"]
+
+    clock.now += 5.0
+    status = limiter.get_status()
+    assert status["wait_time_seconds"] == 0.0
+    assert status["can_make_request"]
+
+
+def test_window_drains_completely(limiter, clock):
+    for _ in range(4):
+        limiter.record_request()
+
+    clock.now += 60.0
+    status = limiter.get_status()
+    assert status["current_requests"] == 0
+    assert status["requests_available"] == 4
+
+
+def test_state_is_shared_through_state_file(tmp_path, clock):
+    state_file = str(tmp_path / "state")
+    first = RateLimiter(max_requests_per_minute=2, window_seconds=60, state_file=state_file)
+    second = RateLimiter(max_requests_per_minute=2, window_seconds=60, state_file=state_file)
+    try:
+        first.record_request()
+        first.record_request()
+        second.record_request()
+
+        assert clock.sleeps == pytest.approx([30.0])
+    finally:
+        first.close()
+        second.close()
+
+
+def test_invalid_state_is_ignored(tmp_path, clock):
+    state_file = tmp_path / "state"
+    state_file.write_bytes(RateLimiter.STATE_FORMAT.pack(float("inf")))
+
+    limiter = RateLimiter(max_requests_per_minute=4, window_seconds=60, state_file=str(state_file))
+    try:
+        assert limiter.get_status()["can_make_request"]
+    finally:
+        limiter.close()
+
+
+def test_queries_see_requests_from_other_limiters(tmp_path, clock):
+    state_file = str(tmp_path / "state")
+    first = RateLimiter(max_requests_per_minute=2, window_seconds=60, state_file=state_file)
+    second = RateLimiter(max_requests_per_minute=2, window_seconds=60, state_file=state_file)
+    try:
+        assert second.can_make_request()
+
+        first.record_request()
+        first.record_request()
+
+        assert second.get_current_count() == 2
+        assert second.get_time_until_available() == pytest.approx(30.0)
+        assert not second.can_make_request()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_status_reports_reserved_slots_as_queued(limiter, clock, monkeypatch):
+    # Callers still sleeping toward their reserved slots: the clock stands still
+    monkeypatch.setattr(clock, "sleep", clock.sleeps.append)
+    for _ in range(7):
+        limiter.record_request()
+
+    status = limiter.get_status()
+    assert status["current_requests"] == 4
+    assert status["queued_requests"] == 3
+    assert status["requests_available"] == 0
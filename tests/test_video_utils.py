@@ -0,0 +1,73 @@
+"""Tests for reading MP4 durations from the movie header."""
+
+import io
+import struct
+
+from src.utils.video_utils import _read_mp4_duration
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    """Build a box with a 32-bit size."""
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _large_box(box_type: bytes, payload: bytes) -> bytes:
+    """Build a box with a 64-bit largesize."""
+    return struct.pack(">I4sQ", 1, box_type, 16 + len(payload)) + payload
+
+
+def _mvhd_v0(timescale: int, duration: int) -> bytes:
+    # version + flags, creation and modification times, timescale, duration
+    return _box(b"mvhd", struct.pack(">B3xIIII", 0, 0, 0, timescale, duration) + bytes(80))
+
+
+def _mvhd_v1(timescale: int, duration: int) -> bytes:
+    return _box(b"mvhd", struct.pack(">B3xQQIQ", 1, 0, 0, timescale, duration) + bytes(80))
+
+
+def test_reads_version_0_header():
+    data = _box(b"ftyp", b"isom" + bytes(8)) + _box(b"moov", _mvhd_v0(1000, 8000))
+
+    assert _read_mp4_duration(io.BytesIO(data)) == 8.0
+
+
+def test_reads_version_1_header():
+    data = _box(b"ftyp", b"isom" + bytes(8)) + _box(b"moov", _mvhd_v1(600, 2**33 * 3))
+
+    assert _read_mp4_duration(io.BytesIO(data)) == 2**33 * 3 / 600
+
+
+def test_skips_64_bit_boxes():
+    data = _box(b"ftyp", b"isom" + bytes(8)) + _large_box(b"mdat", bytes(64)) + _box(b"moov", _mvhd_v0(90000, 45000))
+
+    assert _read_mp4_duration(io.BytesIO(data)) == 0.5
+
+
+def test_reads_64_bit_moov():
+    data = _box(b"ftyp", b"isom" + bytes(8)) + _large_box(b"moov", _mvhd_v1(1000, 4000))
+
+    assert _read_mp4_duration(io.BytesIO(data)) == 4.0
+
+
+def test_skips_boxes_before_header_inside_moov():
+    moov = _box(b"moov", _box(b"udta", bytes(16)) + _mvhd_v0(1000, 2500))
+
+    assert _read_mp4_duration(io.BytesIO(_box(b"ftyp", bytes(12)) + moov)) == 2.5
+
+
+def test_returns_none_without_header():
+    data = _box(b"ftyp", b"isom" + bytes(8)) + _box(b"mdat", bytes(32))
+
+    assert _read_mp4_duration(io.BytesIO(data)) is None
+
+
+def test_returns_none_when_moov_has_no_header():
+    data = _box(b"moov", _box(b"trak", bytes(16))) + _box(b"mvhd", bytes(100))
+
+    assert _read_mp4_duration(io.BytesIO(data)) is None
+
+
+def test_returns_none_for_zero_timescale():
+    data = _box(b"moov", _mvhd_v0(0, 1000))
+
+    assert _read_mp4_duration(io.BytesIO(data)) is None